@@ -0,0 +1,215 @@
+"""Benchmark CycloneDXGenerator phase by phase on synthetic Bazel graphs.
+
+For every graph size, writes a `bazel query --output=xml` document of
+jvm_import rules and measures wall time and peak traced memory of parsing,
+component extraction, dependency extraction, the streaming end-to-end build
+(also through a cold rule cache, a warm one, and a warm one read with every
+rule's location moved to another output base and shifted down a few lines,
+with cache hit counts) and generation plus serialization of each CycloneDX
+spec version as JSON, XML and protobuf, with the size of each output. Results are JSON; pass an earlier
+run as --baseline to get per-phase time ratios.
+
+    $ python3 benchmarks/bench_generator.py --sizes 1000 10000 100000 --output bench.json
+    $ python3 benchmarks/bench_generator.py --baseline bench.json
+"""
+import argparse
+import io
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from index import CycloneDXGenerator, CycloneDXVersion, _generate_bom, write_bom_json  # noqa: E402
+from synthetic_graph import generate_rules, write_xml  # noqa: E402
+from utils.cyclonedxProto import write_bom_protobuf  # noqa: E402
+from utils.cyclonedxXml import write_bom_xml  # noqa: E402
+from utils.ruleCache import RuleCache  # noqa: E402
+
+
+def _measure(repeat, phase):
+    """Return (best seconds, peak traced bytes, result) for a phase.
+
+    Timings run without tracemalloc, which slows allocation-heavy code
+    severalfold; peak memory comes from one extra traced run.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        result = phase()
+        timings.append(perf_counter() - started)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    traced = phase()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    del traced
+    return min(timings), peak, result
+
+
+def _bare_generator():
+    generator = CycloneDXGenerator.__new__(CycloneDXGenerator)
+    generator.component_pool = None
+    generator.tree = None
+    return generator
+
+
+def bench_size(rule_count, repeat, seed, workdir):
+    xml_path = Path(workdir) / f"query_{rule_count}.xml"
+    shifted_path = Path(workdir) / f"query_{rule_count}_shifted.xml"
+    synthetic_rules = generate_rules(rule_count, seed=seed)
+    with open(xml_path, "w") as f:
+        write_xml(synthetic_rules, f)
+    with open(shifted_path, "w") as f:
+        write_xml(synthetic_rules, f, build_file="/home/ci/.cache/bazel/output_base/external/maven/BUILD", first_line=4)
+    del synthetic_rules
+
+    phases = {}
+
+    def record(name, phase, output_bytes=False):
+        seconds, peak, result = _measure(repeat, phase)
+        phases[name] = {"seconds": round(seconds, 4), "peak_bytes": peak}
+        if output_bytes:
+            phases[name]["output_bytes"] = result
+        return result
+
+    def parse():
+        return ET.parse(xml_path).getroot().findall(".//rule[@class='jvm_import']")
+    rules = record("parse", parse)
+
+    generator = _bare_generator()
+
+    def extract_components():
+        return [generator._extract_component(rule) for rule in rules]
+    components = record("extract_components", extract_components)
+
+    def extract_dependencies():
+        dependency_generator = _bare_generator()
+        deps = [generator._extract_rule_deps(rule) for rule in rules]
+        # Resolving dep labels needs every component indexed first
+        dependency_generator._ingest_records(
+            (rule.get("name", ""), component, labels)
+            for rule, component, labels in zip(rules, components, deps)
+            if component is not None
+        )
+        return dependency_generator
+    generator = record("extract_dependencies", extract_dependencies)
+    del rules, components
+
+    def build_streaming():
+        with open(xml_path, "rb") as f:
+            return CycloneDXGenerator.from_file(f)
+    record("build_streaming", build_streaming)
+
+    cache_dir = Path(workdir) / f"cache_{rule_count}"
+    cache_dir.mkdir()
+    fresh_caches = itertools.count()
+
+    def build_cached(cache_path, input_path):
+        with open(input_path, "rb") as f, RuleCache(cache_path) as cache:
+            CycloneDXGenerator.from_file(f, cache=cache)
+        return {"hits": cache.hits, "misses": cache.misses}
+
+    cache_phases = {
+        "build_cached_cold": lambda: build_cached(cache_dir / f"cold_{next(fresh_caches)}.db", xml_path),
+        "build_cached_warm": lambda: build_cached(cache_dir / "warm.db", xml_path),
+        # Same rules at other locations must still hit
+        "build_cached_shifted": lambda: build_cached(cache_dir / "warm.db", shifted_path),
+    }
+    build_cached(cache_dir / "warm.db", xml_path)
+    for name, phase in cache_phases.items():
+        counts = record(name, phase)
+        phases[name].update(counts)
+
+    for version in CycloneDXVersion:
+        def generate(version=version):
+            sink = io.StringIO()
+            write_bom_json(_generate_bom(generator, version), sink)
+            return sink.tell()
+        record(f"generate_{version.value}", generate, output_bytes=True)
+
+        def generate_xml(version=version):
+            sink = io.StringIO()
+            write_bom_xml(_generate_bom(generator, version), sink)
+            return sink.tell()
+        record(f"generate_{version.value}_xml", generate_xml, output_bytes=True)
+
+        def generate_protobuf(version=version):
+            sink = io.BytesIO()
+            write_bom_protobuf(_generate_bom(generator, version), sink)
+            return sink.tell()
+        record(f"generate_{version.value}_protobuf", generate_protobuf, output_bytes=True)
+
+    return {
+        "rules": rule_count,
+        "xml_bytes": xml_path.stat().st_size,
+        "components": len(generator.component_records),
+        "dependencies": len(generator.dependencies),
+        "phases": phases,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results, baseline):
+    """Add the ratio of each phase's time to the baseline's (above 1 is slower)."""
+    for size, current in results["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if not previous:
+            continue
+        for name, phase in current["phases"].items():
+            before = previous["phases"].get(name)
+            if before and before["seconds"]:
+                phase["seconds_vs_baseline"] = round(phase["seconds"] / before["seconds"], 3)
+                phase["peak_bytes_vs_baseline"] = round(phase["peak_bytes"] / before["peak_bytes"], 3) if before["peak_bytes"] else None
+    results["baseline_commit"] = baseline.get("commit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Graph sizes in jvm_import rules")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per phase; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write results to this file instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="Earlier results to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for rule_count in args.sizes:
+            results["sizes"][str(rule_count)] = bench_size(rule_count, args.repeat, args.seed, workdir)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            _compare(results, json.load(f))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare bazel query output formats as SBOM generator input.
+
+Writes the same synthetic graph as xml, proto and streamed_proto, then
+reports file size and the time to build a CycloneDXGenerator from each.
+
+    $ python3 benchmarks/bench_query_formats.py --rules 10000
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from index import CycloneDXGenerator  # noqa: E402
+from synthetic_graph import generate_rules, write_proto, write_xml  # noqa: E402
+
+
+def _best_of(repeat, build):
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        generator = build()
+        timings.append(perf_counter() - started)
+    return min(timings), generator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=10000, help="Number of jvm_import rules to generate")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per format; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rules = generate_rules(args.rules, seed=args.seed)
+    results = {"rules": args.rules, "formats": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = {name: Path(workdir) / f"query.{name}" for name in ("xml", "proto", "streamed_proto")}
+        with open(paths["xml"], "w") as f:
+            write_xml(rules, f)
+        with open(paths["proto"], "wb") as f:
+            write_proto(rules, f)
+        with open(paths["streamed_proto"], "wb") as f:
+            write_proto(rules, f, streamed=True)
+
+        builders = {
+            "xml": lambda f: CycloneDXGenerator.from_file(f),
+            "proto": lambda f: CycloneDXGenerator.from_proto(f),
+            "streamed_proto": lambda f: CycloneDXGenerator.from_proto(f, streamed=True),
+        }
+        for name, path in paths.items():
+            def build():
+                with open(path, "rb") as f:
+                    return builders[name](f)
+            seconds, generator = _best_of(args.repeat, build)
+            results["formats"][name] = {
+                "bytes": path.stat().st_size,
+                "seconds": round(seconds, 4),
+                "components": len(generator.component_records),
+                "dependencies": len(generator.dependencies),
+            }
+
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
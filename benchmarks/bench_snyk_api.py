@@ -0,0 +1,147 @@
+"""Load-test the Snyk API layer against the local mock server.
+
+Runs four scenarios through SnykClient and its rate-limit scheduler:
+paginating org memberships, polling existing SBOM test runs, bulk
+submission of SBOM tests and bulk onboarding of users across orgs. Reports
+throughput, p50/p99 request latency and scheduler retry counts as JSON.
+
+    $ python3 benchmarks/bench_snyk_api.py --latency 0.02 --error-rate-429 0.01 --error-rate-5xx 0.01
+"""
+import argparse
+import contextlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_snyk_server import MockConfig, MockSnykServer  # noqa: E402
+from utils.onboarding import Onboarding, onboard_users  # noqa: E402
+from utils.rateLimit import RateLimitScheduler  # noqa: E402
+from utils.sbomTestPoller import SbomTestPoller  # noqa: E402
+from utils.snykApi import SnykClient  # noqa: E402
+
+SBOM = {"bomFormat": "CycloneDX", "specVersion": "1.4", "version": 1, "components": []}
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class TimedClient(SnykClient):
+    """SnykClient that records the latency of every call, including scheduler waits and retries."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+        self._latency_lock = Lock()
+
+    def request(self, method, url, headers=None, **kwargs):
+        started = perf_counter()
+        try:
+            return super().request(method, url, headers, **kwargs)
+        finally:
+            with self._latency_lock:
+                self.latencies.append(perf_counter() - started)
+
+
+def _run_scenario(server, args, scenario):
+    scheduler = RateLimitScheduler(rate=args.rate, burst=args.burst, base_delay=0.05, max_delay=1.0)
+    client = TimedClient(token="00000000-0000-0000-0000-000000000000", pool_size=args.pool_size,
+                         base_url=server.url, scheduler=scheduler)
+    with client:
+        started = perf_counter()
+        items = scenario(client, args)
+        seconds = perf_counter() - started
+    latencies = client.latencies
+    stats = scheduler.stats()
+    return {
+        "items": items,
+        "requests": len(latencies),
+        "seconds": round(seconds, 4),
+        "requests_per_second": round(len(latencies) / seconds, 1) if seconds else None,
+        "p50_ms": round(_percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "retries": stats["retries"],
+        "throttled": stats["throttled"],
+        "rate_limit_wait_seconds": stats["wait_seconds"],
+    }
+
+
+def paginate(client, args):
+    def memberships(org_index):
+        return sum(1 for _ in client.iter_org_memberships(f"org-{org_index}"))
+
+    with ThreadPoolExecutor(max_workers=args.pool_size) as executor:
+        return sum(executor.map(memberships, range(args.orgs)))
+
+
+def poll(client, args):
+    with ThreadPoolExecutor(max_workers=args.pool_size) as executor:
+        responses = list(executor.map(lambda index: client.create_sbom_test_run("org-0", SBOM), range(args.runs)))
+    # Only the polling is of interest here
+    client.latencies.clear()
+    runs = [(index, "org-0", response["data"]["id"]) for index, response in enumerate(responses)]
+    poller = SbomTestPoller(client, max_concurrency=args.pool_size, poll_interval=0.2, max_poll_interval=1.0)
+    return sum(1 for result in poller.poll(runs) if result.error is None)
+
+
+def bulk_submit(client, args):
+    poller = SbomTestPoller(client, max_concurrency=args.pool_size, poll_interval=0.2, max_poll_interval=1.0)
+    sboms = [(index, f"org-{index % 10}", SBOM) for index in range(args.runs)]
+    return sum(1 for result in poller.submit_and_poll(sboms) if result.error is None)
+
+
+def onboard(client, args):
+    # Half the users are already members and every fifth goes to the group; each
+    # org's and the group's memberships are fetched once
+    onboardings = [Onboarding(f"user{index // 2}@example.com" if index % 2 else f"new{index}@example.com",
+                              f"user-{index}", "group-0", None if index % 5 == 0 else f"org-{index % args.orgs}",
+                              "collaborator") for index in range(args.runs)]
+    return sum(1 for result in onboard_users(client, onboardings, workers=args.pool_size) if result.status != "failed")
+
+
+SCENARIOS = {"pagination": paginate, "polling": poll, "bulk_submission": bulk_submit, "onboarding": onboard}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="Scenario to run (default: all)")
+    parser.add_argument("--orgs", type=int, default=50, help="Orgs whose memberships are paginated or onboarded to")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per membership list")
+    parser.add_argument("--runs", type=int, default=200, help="SBOM test runs to poll or submit, and users to onboard")
+    parser.add_argument("--test-duration", type=float, default=1.0, help="Seconds each mock test run stays processing")
+    parser.add_argument("--latency", type=float, default=0.01, help="Mock server latency per request in seconds")
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-5xx", type=float, default=0.0)
+    parser.add_argument("--pool-size", type=int, default=10, help="Client connection pool size and concurrency")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Scheduler requests per second")
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, pages=args.pages, error_rate_429=args.error_rate_429,
+                        error_rate_5xx=args.error_rate_5xx, retry_after=0.05, test_duration=args.test_duration,
+                        seed=args.seed)
+    results = {"config": {key: value for key, value in vars(args).items() if key != "scenario"}, "scenarios": {}}
+    with MockSnykServer(config) as server:
+        # The scheduler reports retries on stdout; keep stdout for the JSON results
+        with contextlib.redirect_stdout(sys.stderr):
+            for name in args.scenario or SCENARIOS:
+                results["scenarios"][name] = _run_scenario(server, args, SCENARIOS[name])
+        results["server"] = dict(server.counts)
+
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if results["server"]["unmatched"]:
+        sys.exit(f"{results['server']['unmatched']} requests went to routes the Snyk API does not have")
+
+
+if __name__ == "__main__":
+    main()
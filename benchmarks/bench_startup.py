@@ -0,0 +1,90 @@
+"""Measure CLI cold start: wall time of short index.py invocations in fresh interpreters.
+
+Runs `--help`, `generate-sbom --help` and a real generate-sbom on a small
+synthetic graph, each in a new process without SNYK_TOKEN set, and reports
+the min and median milliseconds plus the slowest top-level imports.
+
+    $ python3 benchmarks/bench_startup.py --runs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from synthetic_graph import generate_rules, write_xml  # noqa: E402
+
+
+def _time_command(args, runs, env):
+    timings = []
+    for _ in range(runs):
+        started = perf_counter()
+        completed = subprocess.run([sys.executable, *args], cwd=REPO, env=env, capture_output=True)
+        timings.append(perf_counter() - started)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed: {completed.stderr.decode(errors='replace')}")
+    return {
+        "min_ms": round(min(timings) * 1000, 1),
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+    }
+
+
+def _slowest_imports(env, limit):
+    """Return the top-level modules index.py imports, slowest first, from -X importtime."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import index"], cwd=REPO, env=env,
+                               capture_output=True, text=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Children are listed before their importer and indented two spaces
+        # per level; keep the direct children of index, dropping site's imports
+        if not name.startswith("   "):
+            if name.strip() == "index":
+                break
+            imports = []
+        elif not name.startswith("     "):
+            imports.append((name.strip(), int(cumulative) / 1000))
+    return [{"module": name, "ms": round(ms, 1)} for name, ms in sorted(imports, key=lambda item: -item[1])[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Invocations per command")
+    parser.add_argument("--rules", type=int, default=100, help="jvm_import rules in the generate-sbom input")
+    parser.add_argument("--imports", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    # Offline commands must not need a token
+    env = {key: value for key, value in os.environ.items() if key != "SNYK_TOKEN"}
+    results = {"python": sys.version.split()[0], "runs": args.runs, "commands": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        query = Path(workdir) / "query.xml"
+        with open(query, "w") as f:
+            write_xml(generate_rules(args.rules), f)
+        commands = {
+            "python_only": ["-c", "pass"],
+            "help": ["index.py", "--help"],
+            "generate_sbom_help": ["index.py", "generate-sbom", "--help"],
+            "generate_sbom": ["index.py", "generate-sbom", "-i", str(query), "-o", str(Path(workdir) / "sbom.json")],
+        }
+        for name, command in commands.items():
+            results["commands"][name] = _time_command(command, args.runs, env)
+    results["slowest_imports"] = _slowest_imports(env, args.imports)
+
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
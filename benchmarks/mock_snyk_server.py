@@ -0,0 +1,226 @@
+"""Local stand-in for the Snyk API endpoints used by utils/snykApi.py.
+
+Serves orgs, memberships, invites, projects, group memberships, SBOM test
+runs and the v1 add-member call with configurable latency, pagination depth
+and injected 429 / 5xx responses, so the API layer can be exercised without
+a token or network access.
+
+    $ python3 benchmarks/mock_snyk_server.py --port 8080 --latency 0.05 --error-rate-429 0.02
+    $ SNYK_TOKEN=... python3 -c "from utils.snykApi import SnykClient; SnykClient(base_url='http://127.0.0.1:8080')"
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Collection endpoints and the JSON:API type of their items
+COLLECTIONS = [
+    (re.compile(r'^/rest/groups/(?P<parent>[^/]+)/orgs/?$'), 'org'),
+    (re.compile(r'^/rest/orgs/(?P<parent>[^/]+)/memberships/?$'), 'org_membership'),
+    (re.compile(r'^/rest/groups/(?P<parent>[^/]+)/memberships/?$'), 'group_membership'),
+    (re.compile(r'^/rest/orgs/(?P<parent>[^/]+)/invites/?$'), 'org_invitation'),
+    (re.compile(r'^/rest/orgs/(?P<parent>[^/]+)/projects/?$'), 'project'),
+]
+SBOM_TESTS = re.compile(r'^/rest/orgs/(?P<org>[^/]+)/sbom_tests/?$')
+SBOM_TEST = re.compile(r'^/rest/orgs/(?P<org>[^/]+)/sbom_tests/(?P<id>[^/]+)(?P<results>/results)?/?$')
+GROUP_MEMBERSHIPS = re.compile(r'^/rest/groups/(?P<group>[^/]+)/memberships/?$')
+V1_ADD_MEMBER = re.compile(r'^/v1/group/[^/]+/org/[^/]+/members/?$')
+
+
+class MockConfig(NamedTuple):
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    pages: int = 3
+    page_size: Optional[int] = None
+    error_rate_429: float = 0.0
+    error_rate_5xx: float = 0.0
+    retry_after: float = 0.1
+    test_duration: float = 1.0
+    seed: int = 0
+
+
+class MockSnykServer:
+    """Threaded HTTP server implementing the mocked endpoints; use as a context manager."""
+
+    def __init__(self, config: MockConfig = MockConfig(), host: str = '127.0.0.1', port: int = 0):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.test_runs = {}
+        self.run_ids = itertools.count(1)
+        self.counts = {'requests': 0, 'throttled': 0, 'errors': 0, 'unmatched': 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'MockSnykServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _injected_failure(self) -> Optional[int]:
+        with self.lock:
+            self.counts['requests'] += 1
+            roll = self.rng.random()
+            if roll < self.config.error_rate_429:
+                self.counts['throttled'] += 1
+                return 429
+            if roll < self.config.error_rate_429 + self.config.error_rate_5xx:
+                self.counts['errors'] += 1
+                return self.rng.choice((500, 502, 503, 504))
+            delay = self.config.latency + self.rng.uniform(0, self.config.latency_jitter)
+        if delay:
+            sleep(delay)
+        return None
+
+    def _collection_page(self, path, query, item_type, parent):
+        limit = self.config.page_size or int(query.get('limit', ['10'])[0])
+        start = int(query.get('starting_after', ['0'])[0])
+        total = limit * self.config.pages
+        data = [{'id': f'{parent}-{item_type}-{index}', 'type': item_type,
+                 'attributes': {'name': f'{item_type} {index}', 'email': f'user{index}@example.com'}}
+                for index in range(start, min(start + limit, total))]
+        if item_type.endswith('_membership'):
+            for item in data:
+                item['relationships'] = {'user': {'data': {'id': f"user-{item['id']}", 'type': 'user',
+                                                           'attributes': {'email': item['attributes']['email']}}}}
+        page = {'data': data, 'links': {}}
+        if start + limit < total:
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query['starting_after'] = str(start + limit)
+            # Snyk returns next links relative to the API host
+            page['links']['next'] = f'{path}?{urlencode(next_query)}'
+        return page
+
+    def _create_test_run(self, org_id):
+        with self.lock:
+            run_id = f'sbom-test-{next(self.run_ids)}'
+            self.test_runs[run_id] = monotonic() + self.config.test_duration
+        return {'data': {'id': run_id, 'type': 'sbom_test', 'attributes': {'status': 'processing'}}}
+
+    def _test_run(self, run_id, results):
+        finishes_at = self.test_runs.get(run_id)
+        if finishes_at is None:
+            return 404, {'errors': [{'status': '404', 'detail': f'SBOM test {run_id} not found'}]}
+        if results:
+            return 200, {'data': {'id': run_id, 'type': 'sbom_test',
+                                  'attributes': {'summary': {'total_issues': 0, 'total_vulnerable_packages': 0},
+                                                 'sbom': {'format': 'CycloneDX JSON'}}}}
+        status = 'finished' if monotonic() >= finishes_at else 'processing'
+        return 200, {'data': {'id': run_id, 'type': 'sbom_test', 'attributes': {'status': status}}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out as separate writes; without this, delayed
+            # ACKs add ~40ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None, headers=None):
+                payload = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/vnd.api+json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _respond(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                failure = server._injected_failure()
+                if failure == 429:
+                    return self._send(429, {'errors': [{'status': '429', 'detail': 'Too many requests'}]},
+                                      {'Retry-After': str(server.config.retry_after)})
+                if failure is not None:
+                    return self._send(failure, {'errors': [{'status': str(failure), 'detail': 'Injected failure'}]})
+
+                parsed = urlparse(self.path)
+                path, query = parsed.path, parse_qs(parsed.query)
+                if method == 'GET':
+                    match = SBOM_TEST.match(path)
+                    if match:
+                        return self._send(*server._test_run(match['id'], match['results']))
+                    for pattern, item_type in COLLECTIONS:
+                        match = pattern.match(path)
+                        if match:
+                            return self._send(200, server._collection_page(path, query, item_type, match['parent']))
+                elif method == 'POST':
+                    match = SBOM_TESTS.match(path)
+                    if match:
+                        return self._send(201, server._create_test_run(match['org']))
+                    if GROUP_MEMBERSHIPS.match(path):
+                        return self._send(201, {'data': {'id': f'membership-{next(server.run_ids)}', 'type': 'group_membership'}})
+                    if V1_ADD_MEMBER.match(path):
+                        return self._send(200, {})
+                # Only the real routes are served, so a wrong client URL shows up here
+                with server.lock:
+                    server.counts['unmatched'] += 1
+                self._send(404, {'errors': [{'status': '404', 'detail': f'No mock for {method} {path}'}]})
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self._respond('POST')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='Extra random latency of up to this many seconds')
+    parser.add_argument('--pages', type=int, default=3, help='Pages in every collection')
+    parser.add_argument('--page-size', type=int, default=None, help='Items per page (defaults to the limit query parameter)')
+    parser.add_argument('--error-rate-429', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--error-rate-5xx', type=float, default=0.0, help='Fraction of requests answered with a 5xx')
+    parser.add_argument('--retry-after', type=float, default=0.1, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--test-duration', type=float, default=1.0, help='Seconds an SBOM test run stays processing')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.latency_jitter, args.pages, args.page_size, args.error_rate_429,
+                        args.error_rate_5xx, args.retry_after, args.test_duration, args.seed)
+    server = MockSnykServer(config, args.host, args.port)
+    print(f'Mock Snyk API listening on {server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
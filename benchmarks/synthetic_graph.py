@@ -0,0 +1,125 @@
+import random
+from typing import IO, List, NamedTuple, Optional
+from xml.sax.saxutils import quoteattr
+
+# Synthetic Bazel dependency graphs for benchmarking SBOM generation, written
+# in the same shapes `bazel query "deps(...)"` produces for rules_jvm_external
+# jvm_import rules: --output=xml, --output=proto and --output=streamed_proto.
+
+
+class SyntheticRule(NamedTuple):
+    name: str
+    rule_class: str
+    maven_coordinates: Optional[str]
+    deps: List[str]
+
+
+def generate_rules(rule_count: int, seed: int = 0, mean_fan_out: float = 4.0, max_fan_out: int = 60) -> List[SyntheticRule]:
+    """Build a DAG of jvm_import rules plus a handful of first-party java_library rules.
+
+    Fan-out follows a geometric distribution, so most artifacts have a few
+    deps and a small tail has dozens, as in real Maven graphs. Deps always
+    point at lower-numbered artifacts, so the graph is acyclic.
+    """
+    rng = random.Random(seed)
+    group_count = max(1, rule_count // 20)
+    rules = []
+    labels = []
+    for index in range(rule_count):
+        group = f"org.example.group{index % group_count}"
+        artifact = f"artifact-{index}"
+        version = f"{index % 7}.{index % 13}.{index % 3}"
+        label = "@maven//:" + f"{group}_{artifact}".replace(".", "_").replace("-", "_")
+
+        fan_out = 0
+        while fan_out < min(index, max_fan_out) and rng.random() > 1.0 / (mean_fan_out + 1.0):
+            fan_out += 1
+        deps = [labels[dep] for dep in sorted(rng.sample(range(index), fan_out))] if fan_out else []
+
+        rules.append(SyntheticRule(label, "jvm_import", f"{group}:{artifact}:{version}", deps))
+        labels.append(label)
+
+    # First-party code that depends on a sample of the artifacts
+    for index in range(max(1, rule_count // 100)):
+        deps = rng.sample(labels, min(len(labels), 10))
+        rules.append(SyntheticRule(f"//app/module{index}:lib", "java_library", None, deps))
+    return rules
+
+
+def write_xml(rules: List[SyntheticRule], fp: IO, build_file: str = "/workspace/BUILD", first_line: int = 1) -> None:
+    """Write rules as `bazel query --output=xml` does, to a text file handle.
+
+    Rule locations are build_file:line:1 from first_line on; vary them to
+    mimic another machine's output base or edits that shift BUILD lines.
+    """
+    fp.write('<?xml version="1.1" encoding="UTF-8" standalone="no"?>\n<query version="2">\n')
+    for line, rule in enumerate(rules, first_line):
+        fp.write(f'    <rule class="{rule.rule_class}" location={quoteattr(f"{build_file}:{line}:1")} name={quoteattr(rule.name)}>\n')
+        fp.write('        <list name="deps">\n')
+        for dep in rule.deps:
+            fp.write(f'            <label value={quoteattr(dep)}/>\n')
+        fp.write('        </list>\n')
+        if rule.maven_coordinates:
+            fp.write('        <list name="tags">\n')
+            fp.write(f'            <string value={quoteattr("maven_coordinates=" + rule.maven_coordinates)}/>\n')
+            fp.write('        </list>\n')
+        for dep in rule.deps:
+            fp.write(f'        <rule-input name={quoteattr(dep)}/>\n')
+        fp.write('    </rule>\n')
+    fp.write('</query>\n')
+
+
+# build.proto field numbers and enum values used below
+_TARGET_TYPE_RULE = 1
+_ATTRIBUTE_STRING_LIST = 5
+_ATTRIBUTE_LABEL_LIST = 6
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(field_number: int, payload: bytes) -> bytes:
+    return _varint(field_number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(field_number: int, value: int) -> bytes:
+    return _varint(field_number << 3) + _varint(value)
+
+
+def _string_list_attribute(name: str, attribute_type: int, values: List[str]) -> bytes:
+    payload = _field(1, name.encode()) + _varint_field(2, attribute_type)
+    for value in values:
+        payload += _field(6, value.encode())
+    return payload
+
+
+def encode_target(rule: SyntheticRule, line: int) -> bytes:
+    """Encode a rule as a build.proto Target message."""
+    payload = _field(1, rule.name.encode()) + _field(2, rule.rule_class.encode())
+    payload += _field(3, f"/workspace/BUILD:{line}:1".encode())
+    payload += _field(4, _string_list_attribute("deps", _ATTRIBUTE_LABEL_LIST, rule.deps))
+    tags = [f"maven_coordinates={rule.maven_coordinates}"] if rule.maven_coordinates else []
+    payload += _field(4, _string_list_attribute("tags", _ATTRIBUTE_STRING_LIST, tags))
+    for dep in rule.deps:
+        payload += _field(5, dep.encode())
+    return _varint_field(1, _TARGET_TYPE_RULE) + _field(2, payload)
+
+
+def write_proto(rules: List[SyntheticRule], fp: IO, streamed: bool = False) -> None:
+    """Write rules as `bazel query --output=proto` (or streamed_proto) does, to a binary file handle."""
+    for line, rule in enumerate(rules, 1):
+        target = encode_target(rule, line)
+        if streamed:
+            fp.write(_varint(len(target)) + target)
+        else:
+            # A QueryResult is just its repeated target field
+            fp.write(_field(1, target))
@@ -1,95 +1,369 @@
+import io
 import json
-from time import sleep
+import os
+import re
+import sys
+from time import perf_counter, sleep
 import xml.etree.ElementTree as ET
-import utils.snykApi as snykApi
+# Only option defaults and the (dependency-free) metrics recorder are imported
+# eagerly. The Snyk client (requests and the token check), the poller, the
+# rule and result caches, proto/lock file readers and the process pool are
+# imported by the commands that use them, so offline runs start fast.
+from utils.defaults import (DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_POLL_INTERVAL, DEFAULT_MEMBERSHIP_TTL,
+                            DEFAULT_ONBOARDING_WORKERS, DEFAULT_POLL_TIMEOUT, DEFAULT_RESULT_CACHE_MAX_BYTES,
+                            DEFAULT_RESULT_CACHE_TTL)
+from utils import metrics
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 import typer
 from enum import Enum
+from collections.abc import Sequence
+from functools import partial
+
+if TYPE_CHECKING:
+    from utils.ruleCache import RuleCache
 
 class CycloneDXVersion(str, Enum):
     v1_4 = "1.4"
     v1_5 = "1.5"
     v1_6 = "1.6"
+
+class OutputFormat(str, Enum):
+    json = "json"
+    xml = "xml"
+    protobuf = "protobuf"
+
+class InputFormat(str, Enum):
+    xml = "xml"
+    proto = "proto"
+    streamed_proto = "streamed_proto"
+    lockfile = "lockfile"
     
+def iter_jvm_import_rules(bazel_deps_file: IO) -> Iterator[ET.Element]:
+    """Yield jvm_import rules from a Bazel query XML file one at a time.
+
+    Each rule is cleared from the tree once the caller has consumed it, so
+    memory stays bounded by the size of a single rule rather than the file.
+    """
+    root = None
+    for event, elem in ET.iterparse(bazel_deps_file, events=("start", "end")):
+        if root is None:
+            root = elem
+            continue
+        if event != "end" or elem.tag != "rule":
+            continue
+        if elem.get('class') == 'jvm_import':
+            yield elem
+        # Rules are direct children of <query>; drop everything seen so far
+        root.clear()
+
+
+LABEL_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9]')
+
+def maven_label(group: str, artifact: str) -> str:
+    """Return the rules_jvm_external label for a Maven group and artifact."""
+    return '@maven//:' + LABEL_UNSAFE_CHARS.sub('_', f"{group}:{artifact}")
+
+
+class Component:
+    """A Maven library component, independent of CycloneDX spec version.
+
+    Group, artifact and version strings are interned: large graphs repeat the
+    same groups and versions thousands of times. The spec-specific JSON is
+    only built by as_dict(), while the BOM is written.
+    """
+    __slots__ = ('group', 'name', 'version', 'purl')
+
+    def __init__(self, group: str, name: str, version: str):
+        self.group = sys.intern(group)
+        self.name = sys.intern(name)
+        self.version = sys.intern(version)
+        self.purl = f"pkg:maven/{group}/{name}@{version}"
+
+    def __repr__(self) -> str:
+        return f"Component({self.purl!r})"
+
+    def as_dict(self, spec_version: str = "1.4") -> Dict:
+        """Return the component as a CycloneDX JSON object of the given spec version."""
+        component = {
+            "type": "library",
+            "name": self.name,
+            "group": self.group,
+            "version": self.version,
+            "purl": self.purl
+        }
+        if spec_version != "1.4":
+            component["evidence"] = {
+                "identity": {
+                    "field": "maven-coordinate",
+                    "confidence": 1.0
+                }
+            }
+        if spec_version not in ("1.4", "1.5"):
+            component["properties"] = [
+                {
+                    "name": "maven-central",
+                    "value": "true"
+                }
+            ]
+        return component
+
+
+class ComponentList(Sequence):
+    """Read-only list of components projected to one spec version's JSON objects on access.
+
+    Generating one version never changes the shared components, so every
+    version can be produced from the same generator.
+    """
+    __slots__ = ('_components', '_spec_version')
+
+    def __init__(self, components: List[Component], spec_version: str):
+        self._components = components
+        self._spec_version = spec_version
+
+    def __len__(self) -> int:
+        return len(self._components)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [component.as_dict(self._spec_version) for component in self._components[index]]
+        return self._components[index].as_dict(self._spec_version)
+
+    def __iter__(self) -> Iterator[Dict]:
+        spec_version = self._spec_version
+        for component in self._components:
+            yield component.as_dict(spec_version)
+
+
+# (rule label, maven coordinates, @maven dep labels or None) read from one jvm_import rule
+RawRule = Tuple[str, str, Optional[List[str]]]
+# (rule label, component, @maven dep labels or None) extracted from one jvm_import rule
+RuleRecord = Tuple[str, Component, Optional[List[str]]]
+
+
 class CycloneDXGenerator:
-    def __init__(self, bazel_deps_xml: str):
-        """Initialize with Bazel dependencies XML file content."""
-        self.tree = ET.fromstring(bazel_deps_xml)
-        self.components = self._extract_components()
-        self.dependencies = self._extract_dependencies()
-
-    def _extract_components(self) -> List[Dict]:
-        """Extract components from Bazel dependencies."""
-        components = []
-        for rule in self.tree.findall(".//rule[@class='jvm_import']"):
-            tags = rule.find(".//list[@name='tags']")
-            if tags is None:
-                continue
+    def __init__(self, bazel_deps_xml: str, component_pool: Optional[Dict[str, Optional[Component]]] = None):
+        """Initialize with Bazel dependencies XML file content.
 
-            maven_coords = None
-            for tag in tags.findall('string'):
-                if tag.get('value', '').startswith('maven_coordinates='):
-                    maven_coords = tag.get('value').split('=')[1]
-                    break
-            
-            if maven_coords:
-                group_artifact_version = maven_coords.split(':')
-                if len(group_artifact_version) == 3:
-                    group, artifact, version = group_artifact_version
-                    components.append({
-                        "type": "library",
-                        "name": artifact,
-                        "group": group,
-                        "version": version,
-                        "purl": f"pkg:maven/{group}/{artifact}@{version}"
-                    })
-        
-        return components
+        A component pool (Maven coordinates -> component) lets several
+        generators share one record per artifact instead of building their own.
+        """
+        self.component_pool = component_pool
+        with metrics.span("generator.parse"):
+            self.tree = ET.fromstring(bazel_deps_xml)
+        self._ingest_records(self._extract_rule(rule) for rule in self.tree.findall(".//rule[@class='jvm_import']"))
 
-    def _extract_dependencies(self) -> List[Dict]:
-        """Extract dependency relationships."""
-        dependencies = []
-        for rule in self.tree.findall(".//rule[@class='jvm_import']"):
-            deps = rule.find(".//list[@name='deps']")
-            if deps is None:
+    @classmethod
+    def from_file(cls, bazel_deps_file: IO, cache: Optional["RuleCache"] = None,
+                  component_pool: Optional[Dict[str, Optional[Component]]] = None) -> "CycloneDXGenerator":
+        """Initialize from a Bazel dependencies XML file handle, streaming one rule at a time.
+
+        With a rule cache, rules whose XML is unchanged since a previous run are
+        not parsed at all; their extracted records are read from the cache.
+        """
+        generator = cls.__new__(cls)
+        generator.component_pool = component_pool
+        generator.tree = None
+        if cache is None:
+            rules = metrics.timed_iter("generator.parse", iter_jvm_import_rules(bazel_deps_file))
+            records = (generator._extract_rule(rule) for rule in rules)
+        else:
+            # The cache stores plain coordinates; components are rebuilt through the pool
+            raw_rules = metrics.timed_iter("generator.parse",
+                                           cache.records(bazel_deps_file, generator._extract_raw_rule))
+            records = (generator._rule_record(raw_rule) for raw_rule in raw_rules)
+        generator._ingest_records(records)
+        return generator
+
+    @classmethod
+    def from_lockfile(cls, lockfile_path: Path, repo_name: str = "maven", allow_unpinned: bool = False,
+                      component_pool: Optional[Dict[str, Optional[Component]]] = None) -> "CycloneDXGenerator":
+        """Initialize from a MODULE.bazel.lock or rules_jvm_external maven_install.json, without Bazel.
+
+        When the lock file records no dependency edges at all (an unpinned
+        repository), the dependency graph is unknown rather than empty, and
+        the generated SBOMs have no dependencies list.
+        """
+        from utils.lockfile import iter_lockfile_records
+
+        generator = cls.__new__(cls)
+        generator.component_pool = component_pool
+        generator.tree = None
+        records = list(metrics.timed_iter("generator.parse", iter_lockfile_records(lockfile_path, repo_name, allow_unpinned)))
+        generator._ingest_records(generator._lockfile_record(maven_coords, deps) for maven_coords, deps in records)
+        if all(deps is None for _, deps in records):
+            generator.dependencies = None
+        return generator
+
+    @classmethod
+    def from_proto(cls, bazel_query_file: IO, streamed: bool = False,
+                   component_pool: Optional[Dict[str, Optional[Component]]] = None) -> "CycloneDXGenerator":
+        """Initialize from a binary `bazel query --output=proto` (or streamed_proto) file handle."""
+        import utils.bazelProto as bazelProto
+
+        generator = cls.__new__(cls)
+        generator.component_pool = component_pool
+        generator.tree = None
+        generator._ingest_records(
+            generator._proto_record(name, attributes)
+            for name, rule_class, attributes in metrics.timed_iter("generator.parse", bazelProto.iter_rules(bazel_query_file, streamed))
+            if rule_class == 'jvm_import'
+        )
+        return generator
+
+    def _proto_record(self, name: str, attributes: Dict[str, List[str]]) -> Optional[RuleRecord]:
+        """Extract the record of a decoded jvm_import rule, matching the XML extraction."""
+        maven_coords = None
+        for tag in attributes.get('tags', []):
+            if tag.startswith('maven_coordinates='):
+                maven_coords = tag.split('=')[1]
+                break
+        if not maven_coords:
+            return None
+
+        component = self._component(maven_coords)
+        if component is None:
+            return None
+
+        labels = None
+        if 'deps' in attributes and name.startswith('@maven//'):
+            labels = [label for label in attributes['deps'] if label.startswith('@maven//')]
+        return name, component, labels
+
+    def _lockfile_record(self, maven_coords: str, deps: Optional[List[str]]) -> Optional[RuleRecord]:
+        """Turn a lock file artifact into the record a jvm_import rule for it would produce."""
+        component = self._component(maven_coords)
+        if component is None:
+            return None
+        labels = None if deps is None else [maven_label(*dep.split(':')) for dep in deps]
+        return maven_label(component.group, component.name), component, labels
+
+    def _ingest_records(self, records: Iterable[Optional[RuleRecord]]) -> None:
+        """Build components and dependencies in a single pass over extracted rule records.
+
+        Streamed input is parsed as records are pulled, so the recorded
+        generator.extract span includes the generator.parse time.
+        """
+        self.component_records = []
+        # Bazel label -> purl, filled while components are extracted
+        self.label_index = {}
+        rule_deps = []
+        for record in metrics.timed_iter("generator.extract", records):
+            if record is None:
                 continue
+            name, component, labels = record
+            self.component_records.append(component)
+            self.label_index.setdefault(name, component.purl)
+            self.label_index.setdefault(maven_label(component.group, component.name), component.purl)
+
+            if labels is not None:
+                rule_deps.append((component.purl, labels))
+
+        # Dependencies can only be resolved once every component is known
+        with metrics.span("generator.extract_dependencies", rules=len(rule_deps)):
+            self.dependencies = self._extract_dependencies(rule_deps)
+
+    def _extract_rule(self, rule: ET.Element) -> Optional[RuleRecord]:
+        """Extract the record of a single jvm_import rule, if it has Maven coordinates."""
+        component = self._extract_component(rule)
+        if component is None:
+            return None
+        return rule.get('name', ''), component, self._extract_rule_deps(rule)
+
+    def _extract_raw_rule(self, rule: ET.Element) -> Optional[RawRule]:
+        """Extract the plain values of a jvm_import rule's record, as stored in the rule cache."""
+        maven_coords = self._get_maven_coordinates(rule)
+        if not maven_coords or self._component(maven_coords) is None:
+            return None
+        return rule.get('name', ''), maven_coords, self._extract_rule_deps(rule)
+
+    def _rule_record(self, raw_rule: RawRule) -> Optional[RuleRecord]:
+        name, maven_coords, labels = raw_rule
+        component = self._component(maven_coords)
+        if component is None:
+            return None
+        return name, component, labels
+
+    @staticmethod
+    def _get_maven_coordinates(rule: ET.Element) -> Optional[str]:
+        """Return the maven_coordinates tag value of a rule, if any."""
+        tags = rule.find(".//list[@name='tags']")
+        if tags is None:
+            return None
+        for tag in tags.findall('string'):
+            if tag.get('value', '').startswith('maven_coordinates='):
+                return tag.get('value').split('=')[1]
+        return None
+
+    def _extract_component(self, rule: ET.Element) -> Optional[Component]:
+        """Extract a single component from a jvm_import rule."""
+        maven_coords = self._get_maven_coordinates(rule)
+        if not maven_coords:
+            return None
+
+        return self._component(maven_coords)
+
+    def _component(self, maven_coords: str) -> Optional[Component]:
+        """Return the component for group:artifact:version coordinates, reusing pooled records."""
+        pool = self.component_pool
+        if pool is not None and maven_coords in pool:
+            return pool[maven_coords]
+
+        component = None
+        group_artifact_version = maven_coords.split(':')
+        if len(group_artifact_version) == 3:
+            group, artifact, version = group_artifact_version
+            component = Component(group, artifact, version)
+        if pool is not None:
+            pool[maven_coords] = component
+        return component
+
+    def _extract_rule_deps(self, rule: ET.Element) -> Optional[List[str]]:
+        """Return the @maven dep labels of a jvm_import rule, if it has a deps list."""
+        deps = rule.find(".//list[@name='deps']")
+        if deps is None:
+            return None
+
+        name = rule.get('name', '')
+        if not name.startswith('@maven//'):
+            return None
+
+        labels = [
+            dep.get('value', '')
+            for dep in deps.findall('label')
+            if dep.get('value', '').startswith('@maven//')
+        ]
+        return labels
 
-            name = rule.get('name', '')
-            if name.startswith('@maven//'):
-                maven_coords = None
-                tags = rule.find(".//list[@name='tags']")
-                if tags is not None:
-                    for tag in tags.findall('string'):
-                        if tag.get('value', '').startswith('maven_coordinates='):
-                            maven_coords = tag.get('value').split('=')[1]
-                            break
-                
-                if maven_coords:
-                    group, artifact, version = maven_coords.split(':')
-                    dep_refs = []
-                    for dep in deps.findall('label'):
-                        dep_value = dep.get('value', '')
-                        if dep_value.startswith('@maven//'):
-                            # Find corresponding component for this dependency
-                            for comp in self.components:
-                                if dep_value.endswith(comp['name'].replace('-', '_')):
-                                    dep_refs.append(comp['purl'])
-                    
-                    if dep_refs:
-                        dependencies.append({
-                            "ref": f"pkg:maven/{group}/{artifact}@{version}",
-                            "dependsOn": dep_refs
-                        })
+    def _extract_dependencies(self, rule_deps: List[Tuple[str, List[str]]]) -> List[Dict]:
+        """Extract dependency relationships by resolving dep labels through the label index."""
+        dependencies = []
+        label_index = self.label_index
+        for ref, labels in rule_deps:
+            dep_refs = [label_index[label] for label in labels if label in label_index]
+            if dep_refs:
+                dependencies.append({
+                    "ref": ref,
+                    "dependsOn": dep_refs
+                })
 
         return dependencies
 
-    def generate_1_4(self) -> Dict:
-        """Generate CycloneDX 1.4 JSON format."""
-        return {
+    @property
+    def components(self) -> List[Dict]:
+        """Return the extracted components as plain CycloneDX 1.4 component dicts."""
+        return [component.as_dict("1.4") for component in self.component_records]
+
+    def _bom(self, spec_version: str) -> Dict:
+        """Build the BOM for a spec version with its components projected lazily.
+
+        The components list is a ComponentList, which only the streaming
+        writers consume; the public generate_* methods materialize it.
+        """
+        bom = {
             "bomFormat": "CycloneDX",
-            "specVersion": "1.4",
+            "specVersion": spec_version,
             "version": 1,
             "metadata": {
                 "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -100,121 +374,669 @@ class CycloneDXGenerator:
                     }
                 ]
             },
-            "components": self.components,
+            "components": ComponentList(self.component_records, spec_version),
             "dependencies": self.dependencies
         }
+        if self.dependencies is None:
+            # Unknown, not empty: an empty list would claim no component has dependencies
+            del bom["dependencies"]
+        if spec_version != "1.4":
+            # Add 1.5 specific fields; components gain evidence in their projection
+            bom["metadata"]["lifecycles"] = [
+                {
+                    "phase": "build"
+                }
+            ]
+        if spec_version == "1.6":
+            # Add 1.6 specific fields; components gain properties in their projection
+            bom["metadata"]["properties"] = [
+                {
+                    "name": "build-system",
+                    "value": "bazel"
+                }
+            ]
+        return bom
+
+    def _materialized_bom(self, spec_version: str) -> Dict:
+        bom = self._bom(spec_version)
+        bom["components"] = list(bom["components"])
+        return bom
+
+    def generate_1_4(self) -> Dict:
+        """Generate CycloneDX 1.4 JSON format."""
+        return self._materialized_bom("1.4")
 
     def generate_1_5(self) -> Dict:
         """Generate CycloneDX 1.5 JSON format."""
-        bom_1_5 = self.generate_1_4()
-        bom_1_5["specVersion"] = "1.5"
-        # Add 1.5 specific fields
-        bom_1_5["metadata"]["lifecycles"] = [
-            {
-                "phase": "build"
-            }
-        ]
-        for component in bom_1_5["components"]:
-            component["evidence"] = {
-                "identity": {
-                    "field": "maven-coordinate",
-                    "confidence": 1.0
-                }
-            }
-        return bom_1_5
+        return self._materialized_bom("1.5")
 
     def generate_1_6(self) -> Dict:
         """Generate CycloneDX 1.6 JSON format."""
-        bom_1_6 = self.generate_1_5()
-        bom_1_6["specVersion"] = "1.6"
-        # Add 1.6 specific fields
-        bom_1_6["metadata"]["properties"] = [
-            {
-                "name": "build-system",
-                "value": "bazel"
-            }
-        ]
-        for component in bom_1_6["components"]:
-            component["properties"] = [
-                {
-                    "name": "maven-central",
-                    "value": "true"
-                }
-            ]
-        return bom_1_6
+        return self._materialized_bom("1.6")
 
-def generate_cyclonedx_sbom(bazel_deps_xml: str, version: CycloneDXVersion) -> str:
-    generator = CycloneDXGenerator(bazel_deps_xml)
-    
-    version_map = {
-        CycloneDXVersion.v1_4: generator.generate_1_4,
-        CycloneDXVersion.v1_5: generator.generate_1_5,
-        CycloneDXVersion.v1_6: generator.generate_1_6
+def _build_generator(bazel_deps_xml) -> CycloneDXGenerator:
+    """Build a generator from Bazel query XML content or an open binary file handle."""
+    if isinstance(bazel_deps_xml, str):
+        return CycloneDXGenerator(bazel_deps_xml)
+    return CycloneDXGenerator.from_file(bazel_deps_xml)
+
+def _generate_bom(generator: CycloneDXGenerator, version: CycloneDXVersion) -> Dict:
+    """Build the BOM for the streaming writers, with components projected lazily."""
+    return generator._bom(version.value)
+
+def generate_cyclonedx_sbom(bazel_deps_xml, version: CycloneDXVersion) -> str:
+    """Generate a CycloneDX SBOM from Bazel query XML content or an open file handle."""
+    generator = _build_generator(bazel_deps_xml)
+    # Components are projected lazily, so serialize through the streaming writer
+    out = io.StringIO()
+    write_bom_json(_generate_bom(generator, version), out)
+    return out.getvalue()
+
+# BOM keys whose (potentially huge) lists are written one item at a time
+STREAMED_BOM_KEYS = ("components", "dependencies")
+
+def _dump_json_value(value, indent: Optional[int], separators: Tuple[str, str], prefix: str) -> str:
+    text = json.dumps(value, indent=indent, separators=separators)
+    if indent is None:
+        return text
+    # JSON strings never contain raw newlines, so this only re-indents structure
+    return text.replace("\n", "\n" + prefix)
+
+def write_bom_json(bom: Dict, fp: IO, compact: bool = False) -> None:
+    """Write a BOM dict as JSON, streaming the component and dependency lists item by item.
+
+    The indented output is byte-for-byte what json.dumps(bom, indent=2) would
+    produce with the components as plain lists; compact mode drops all
+    optional whitespace.
+    """
+    if compact:
+        indent, separators, newline, pad = None, (',', ':'), '', ''
+    else:
+        indent, separators, newline, pad = 2, (',', ': '), '\n', '  '
+
+    with metrics.span("bom.serialize", format="json", compact=compact):
+        _write_bom_json(bom, fp, indent, separators, newline, pad)
+
+def _write_bom_json(bom: Dict, fp: IO, indent: Optional[int], separators: Tuple[str, str], newline: str, pad: str) -> None:
+    fp.write('{')
+    for position, (key, value) in enumerate(bom.items()):
+        fp.write((separators[0] if position else '') + newline + pad + json.dumps(key) + separators[1])
+        if key not in STREAMED_BOM_KEYS:
+            fp.write(_dump_json_value(value, indent, separators, pad))
+            continue
+
+        fp.write('[')
+        empty = True
+        for item in value:
+            fp.write(('' if empty else separators[0]) + newline + pad * 2)
+            fp.write(_dump_json_value(item, indent, separators, pad * 2))
+            empty = False
+        fp.write(']' if empty else newline + pad + ']')
+    fp.write(newline + '}')
+
+def _write_bom(bom: Dict, output_file: Path, output_format: OutputFormat, compact: bool) -> None:
+    """Write a BOM to a file, or to stdout for -, in the requested CycloneDX encoding."""
+    to_stdout = str(output_file) == "-"
+    if output_format == OutputFormat.protobuf:
+        from utils.cyclonedxProto import write_bom_protobuf
+        if to_stdout:
+            write_bom_protobuf(bom, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            with open(output_file, "wb") as out:
+                write_bom_protobuf(bom, out)
+        return
+
+    if output_format == OutputFormat.xml:
+        from utils.cyclonedxXml import write_bom_xml
+        writer = write_bom_xml
+    else:
+        writer = write_bom_json
+    if to_stdout:
+        writer(bom, sys.stdout, compact=compact)
+        sys.stdout.flush()
+    else:
+        with open(output_file, "w") as out:
+            writer(bom, out, compact=compact)
+
+# Per-process component pool shared by every target a batch worker generates
+_WORKER_COMPONENT_POOL: Dict[str, Optional[Component]] = {}
+
+def _generate_target_sbom(input_file: Path, output_file: Path, version: CycloneDXVersion, compact: bool) -> Dict:
+    """Generate one target's SBOM in a batch worker and report how long it took."""
+    started = perf_counter()
+    with open(input_file, "rb") as f:
+        generator = CycloneDXGenerator.from_file(f, component_pool=_WORKER_COMPONENT_POOL)
+    parsed = perf_counter()
+    with open(output_file, "w") as out:
+        write_bom_json(_generate_bom(generator, version), out, compact=compact)
+    finished = perf_counter()
+    return {
+        "input": str(input_file),
+        "output": str(output_file),
+        "components": len(generator.component_records),
+        "dependencies": len(generator.dependencies),
+        "parse_seconds": round(parsed - started, 4),
+        "write_seconds": round(finished - parsed, 4),
+        "seconds": round(finished - started, 4)
     }
-    
-    return json.dumps(version_map[version](), indent=2)
+
+def _collect_batch_inputs(source: Path, pattern: str = "*.xml") -> List[Path]:
+    """Return the files of a directory matching pattern, or those listed one per line in a manifest."""
+    if source.is_dir():
+        return sorted(source.glob(pattern))
+    inputs = {}
+    with open(source, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                path = Path(line)
+                # Relative manifest entries are resolved against the manifest itself
+                path = path if path.is_absolute() else source.parent / path
+                # A file listed twice is only generated once
+                inputs.setdefault(path.resolve(), path)
+    return list(inputs.values())
+
+def _batch_output_files(inputs: List[Path], output_dir: Path, summary_file: Path) -> List[Path]:
+    """Name each input's SBOM after its path below the inputs' common directory.
+
+    Inputs of one directory keep their stem (deps.xml -> deps.json); the
+    directories of nested inputs are joined in with "__" (pkg1/deps.xml ->
+    pkg1__deps.json), so same-named files of different packages do not
+    overwrite each other. Any name that still collides, with another SBOM
+    or with the summary, is rejected before anything is generated.
+    """
+    if not inputs:
+        return []
+    root = Path(os.path.commonpath([str(path.resolve().parent) for path in inputs]))
+    outputs = [output_dir / ("__".join(path.resolve().relative_to(root).with_suffix("").parts) + ".json")
+               for path in inputs]
+
+    claimed = {summary_file.resolve(): "the batch summary"}
+    for input_file, output_file in zip(inputs, outputs):
+        owner = f"the SBOM of {input_file}"
+        other = claimed.setdefault(output_file.resolve(), owner)
+        if other != owner:
+            raise ValueError(f"{other} and {owner} would both be written to {output_file}")
+    return outputs
 
 app = typer.Typer()
 @app.command()
 def generate_sbom(
-    input_file: Path = typer.Option(..., "--input", "-i", help="Input Bazel deps XML file"),
-    output_file: Path = typer.Option(..., "--output", "-o", help="Output SBOM JSON file"),
-    version: CycloneDXVersion = typer.Option(CycloneDXVersion.v1_4, "--version", "-v", help="CycloneDX version to generate")
+    input_file: Path = typer.Option(..., "--input", "-i", help="Input Bazel query output (XML by default) or lock file"),
+    output_file: Path = typer.Option(..., "--output", "-o", help="Output SBOM file, or - for stdout"),
+    version: CycloneDXVersion = typer.Option(CycloneDXVersion.v1_4, "--version", "-v", help="CycloneDX version to generate"),
+    compact: bool = typer.Option(False, "--compact", help="Write JSON or XML without indentation (not valid with --format protobuf)"),
+    output_format: OutputFormat = typer.Option(OutputFormat.json, "--format", help="CycloneDX encoding: json, xml, or protobuf (binary, smallest)"),
+    cache_file: Optional[Path] = typer.Option(None, "--cache", help="Rule cache file reused across runs to skip unchanged rules (xml input only)"),
+    cache_max_idle_runs: int = typer.Option(10, "--cache-max-idle-runs", help="Evict cached rules unused for this many runs"),
+    input_format: InputFormat = typer.Option(InputFormat.xml, "--input-format", help="Input type: bazel query xml, proto or streamed_proto output, or a MODULE.bazel.lock / maven_install.json lock file"),
+    maven_repo: str = typer.Option("maven", "--maven-repo", help="rules_jvm_external repository to read from a MODULE.bazel.lock"),
+    allow_unpinned: bool = typer.Option(False, "--allow-unpinned", help="Accept an unpinned MODULE.bazel.lock repository; its SBOM has no dependency graph"),
+    metrics_out: Optional[Path] = typer.Option(None, "--metrics-out", help="Write a JSON trace of timed stages to this file"),
+    profile_out: Optional[Path] = typer.Option(None, "--profile", help="Write a cProfile dump of the run to this file")
 ):
     """
     Generate a CycloneDX SBOM from Bazel dependencies XML file.
     """
-    try:
-        # Read input XML file
-        if not input_file.exists():
-            raise typer.BadParameter(f"Input file {input_file} does not exist")
-        
-        with open(input_file, "r") as f:
-            bazel_deps_xml = f.read()
-        
-        # Generate SBOM
-        sbom = generate_cyclonedx_sbom(bazel_deps_xml, version)
+    if compact and output_format == OutputFormat.protobuf:
+        raise typer.BadParameter("only applies to json and xml output; protobuf has no whitespace to drop", param_hint="'--compact'")
+    if cache_file and input_format != InputFormat.xml:
+        raise typer.BadParameter("only applies to --input-format xml; other inputs are not parsed rule by rule", param_hint="'--cache'")
+
+    with metrics.recording("generate-sbom", metrics_out, profile_out):
+        try:
+            # Read input XML file
+            if not input_file.exists():
+                raise typer.BadParameter(f"Input file {input_file} does not exist")
         
-        # Write output JSON file
-        with open(output_file, "w") as f:
-            f.write(sbom)
+            if input_format == InputFormat.lockfile:
+                # Lock files already hold the resolved artifacts, no Bazel query needed
+                generator = CycloneDXGenerator.from_lockfile(input_file, repo_name=maven_repo, allow_unpinned=allow_unpinned)
+            elif input_format in (InputFormat.proto, InputFormat.streamed_proto):
+                with open(input_file, "rb") as f:
+                    generator = CycloneDXGenerator.from_proto(f, streamed=input_format == InputFormat.streamed_proto)
+            else:
+                cache = None
+                if cache_file:
+                    from utils.ruleCache import RuleCache
+                    cache = RuleCache(cache_file, max_idle_runs=cache_max_idle_runs)
+
+                # Stream the input XML rule by rule
+                with open(input_file, "rb") as f:
+                    generator = CycloneDXGenerator.from_file(f, cache=cache)
+
+                if cache is not None:
+                    cache.close()
+                    typer.echo(f"Rule cache: {cache.hits} hits, {cache.misses} misses", err=True)
+
+            # Stream the output item by item
+            _write_bom(_generate_bom(generator, version), output_file, output_format, compact)
         
-        typer.echo(f"Successfully generated CycloneDX {version} SBOM: {output_file}")
+            # Keep stdout clean for the SBOM when piping
+            typer.echo(f"Successfully generated CycloneDX {version} SBOM: {output_file}", err=str(output_file) == "-")
     
-    except Exception as e:
-        typer.echo(f"Error generating SBOM: {str(e)}", err=True)
-        raise typer.Exit(1)
+        except Exception as e:
+            typer.echo(f"Error generating SBOM: {str(e)}", err=True)
+            raise typer.Exit(1)
     
+@app.command()
+def generate_sbom_batch(
+    source: Path = typer.Option(..., "--input", "-i", help="Directory of Bazel deps XML files, or a manifest listing one per line"),
+    output_dir: Path = typer.Option(..., "--output-dir", "-o", help="Directory to write one SBOM per target into"),
+    version: CycloneDXVersion = typer.Option(CycloneDXVersion.v1_4, "--version", "-v", help="CycloneDX version to generate"),
+    compact: bool = typer.Option(False, "--compact", help="Write JSON without indentation"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="Worker processes (defaults to the CPU count)"),
+    summary_file: Optional[Path] = typer.Option(None, "--summary", help="Summary JSON file (defaults to <output-dir>/summary.json)")
+):
+    """
+    Generate CycloneDX SBOMs for many Bazel dependencies XML files in parallel.
+    """
+    if not source.exists():
+        typer.echo(f"Error generating SBOMs: input {source} does not exist", err=True)
+        raise typer.Exit(1)
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    inputs = _collect_batch_inputs(source)
+    summary_file = summary_file or output_dir / "summary.json"
+    try:
+        outputs = _batch_output_files(inputs, output_dir, summary_file)
+    except ValueError as e:
+        typer.echo(f"Error generating SBOMs: {str(e)}", err=True)
+        raise typer.Exit(1)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started = perf_counter()
+    results = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_generate_target_sbom, input_file, output_file, version, compact): input_file
+            for input_file, output_file in zip(inputs, outputs)
+        }
+        for future in as_completed(futures):
+            input_file = futures[future]
+            try:
+                result = future.result()
+                typer.echo(f"Generated {result['output']} in {result['seconds']}s")
+            except Exception as e:
+                # One broken target must not abort the rest of the batch
+                result = {"input": str(input_file), "error": str(e)}
+                typer.echo(f"Error generating SBOM for {input_file}: {str(e)}", err=True)
+            results.append(result)
+
+    failed = [result for result in results if "error" in result]
+    summary = {
+        "version": version.value,
+        "targets": len(results),
+        "failed": len(failed),
+        "seconds": round(perf_counter() - started, 4),
+        "results": sorted(results, key=lambda result: result["input"])
+    }
+    with open(summary_file, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    typer.echo(f"Generated {len(results) - len(failed)} of {len(results)} SBOMs in {summary['seconds']}s, summary: {summary_file}")
+    if failed:
+        raise typer.Exit(1)
+
 @app.command()
 def test_sbom(
     input_file: Path = typer.Option(..., "--input", "-i", help="sbom.json file generated by generate_sbom command"),
     org_id: str = typer.Option(..., "--org-id", "-o", help="Snyk org ID"),
+    poll_timeout: float = typer.Option(DEFAULT_POLL_TIMEOUT, "--poll-timeout", help="Seconds to wait for the test run to finish"),
+    max_poll_interval: float = typer.Option(DEFAULT_MAX_POLL_INTERVAL, "--max-poll-interval", help="Longest wait in seconds between status checks"),
+    result_cache_file: Optional[Path] = typer.Option(None, "--result-cache", help="Cache file answering tests of unchanged SBOMs locally"),
+    result_cache_ttl: float = typer.Option(DEFAULT_RESULT_CACHE_TTL, "--result-cache-ttl", help="Seconds a cached test result stays valid"),
+    result_cache_max_mb: float = typer.Option(DEFAULT_RESULT_CACHE_MAX_BYTES / (1024 * 1024), "--result-cache-max-mb", help="Evict the least recently used results beyond this size"),
+    metrics_out: Optional[Path] = typer.Option(None, "--metrics-out", help="Write a JSON trace of timed stages and Snyk API requests to this file"),
+    profile_out: Optional[Path] = typer.Option(None, "--profile", help="Write a cProfile dump of the run to this file"),
 ):
     """
     Test the SBOM generation.
     """
-    print("Testing SBOM generation...")
-    try:
-        with open(input_file, "r") as f:
-            sbom_data = json.load(f)
-        
-        sbom_test_run_response = snykApi.create_sbom_test_run(org_id, sbom_data)
-        # Extract test run ID from the response
-        if isinstance(sbom_test_run_response, dict) and 'data' in sbom_test_run_response:
-            test_run_id = sbom_test_run_response['data'].get('id')
-            print("Test run ID:", test_run_id)
-            if test_run_id:
-                status_response = snykApi.get_sbom_test_run_status(org_id, test_run_id)
-                print("Test run status:", status_response)
+    import utils.snykApi as snykApi
+    from utils.sbomTestPoller import SbomTestPoller
+    from utils.testResultCache import TestResultCache, sbom_content_hash
+
+    with metrics.recording("test-sbom", metrics_out, profile_out):
+        print("Testing SBOM generation...")
+        cache = None
+        try:
+            with metrics.span("sbom.load"), open(input_file, "r") as f:
+                sbom_data = json.load(f)
+
+            if result_cache_file is not None:
+                cache = TestResultCache(result_cache_file, ttl=result_cache_ttl, max_bytes=int(result_cache_max_mb * 1024 * 1024))
+                with metrics.span("result_cache.get") as attributes:
+                    sbom_hash = sbom_content_hash(sbom_data, org_id)
+                    cached_results = cache.get(sbom_hash)
+                    attributes["hit"] = cached_results is not None
+                if cached_results is not None:
+                    print("Test run status: finished (cached)")
+                    print(json.dumps(cached_results, indent=2))
+                    return
+
+            with metrics.span("snyk.create_test_run"):
+                sbom_test_run_response = snykApi.create_sbom_test_run(org_id, sbom_data)
+            # Extract test run ID from the response
+            if isinstance(sbom_test_run_response, dict) and 'data' in sbom_test_run_response:
+                test_run_id = sbom_test_run_response['data'].get('id')
+                print("Test run ID:", test_run_id)
+                if test_run_id:
+                    poller = SbomTestPoller(snykApi.get_default_client(), timeout=poll_timeout,
+                                            max_poll_interval=max_poll_interval)
+                    with metrics.span("snyk.poll_test_run"):
+                        results = list(poller.poll([(str(input_file), org_id, test_run_id)]))
+                    for result in results:
+                        print("Test run status:", result.status)
+                        if result.error:
+                            print(f"Error in SBOM test run: {result.error}")
+                            raise typer.Exit(1)
+                        if cache is not None:
+                            cache.put(sbom_hash, result.results)
+                        print(json.dumps(result.results, indent=2))
+                else:
+                    print("Error: Could not find test run ID in response")
+                    raise typer.Exit(1)
             else:
-                print("Error: Could not find test run ID in response")
+                print(f"Error in SBOM test run: {sbom_test_run_response}")
                 raise typer.Exit(1)
-        else:
-            print(f"Error in SBOM test run: {sbom_test_run_response}")
-            raise typer.Exit(1)
             
-    except Exception as e:
-        print(f"Error during SBOM test: {str(e)}")
+        except Exception as e:
+            print(f"Error during SBOM test: {str(e)}")
+            raise typer.Exit(1)
+        finally:
+            if cache is not None:
+                cache.close()
+
+def _load_sbom(input_file: Path) -> dict:
+    with open(input_file, "r") as f:
+        return json.load(f)
+
+def _load_org_map(org_map_file: Optional[Path]) -> Dict[str, str]:
+    """Read a JSON object mapping SBOM file names (or their stems) to Snyk org IDs."""
+    if org_map_file is None:
+        return {}
+    with open(org_map_file, "r") as f:
+        org_map = json.load(f)
+    if not isinstance(org_map, dict):
+        raise ValueError(f"{org_map_file} must contain a JSON object of file name to org ID")
+    return org_map
+
+@app.command()
+def test_sbom_batch(
+    source: Path = typer.Option(..., "--input", "-i", help="Directory of SBOM JSON files, or a manifest listing one per line"),
+    report_file: Path = typer.Option(..., "--report", "-r", help="JSONL report, one line per SBOM as its test finishes"),
+    org_id: Optional[str] = typer.Option(None, "--org-id", "-o", help="Snyk org ID for SBOMs not in the org map"),
+    org_map_file: Optional[Path] = typer.Option(None, "--org-map", help="JSON file mapping SBOM file names or stems to Snyk org IDs"),
+    concurrency: int = typer.Option(DEFAULT_MAX_CONCURRENCY, "--concurrency", "-c", help="Maximum Snyk API calls in flight at once"),
+    poll_timeout: float = typer.Option(DEFAULT_POLL_TIMEOUT, "--poll-timeout", help="Seconds to wait for each test run to finish"),
+    max_poll_interval: float = typer.Option(DEFAULT_MAX_POLL_INTERVAL, "--max-poll-interval", help="Longest wait in seconds between status checks"),
+    result_cache_file: Optional[Path] = typer.Option(None, "--result-cache", help="Cache file answering tests of unchanged SBOMs locally"),
+    result_cache_ttl: float = typer.Option(DEFAULT_RESULT_CACHE_TTL, "--result-cache-ttl", help="Seconds a cached test result stays valid"),
+    result_cache_max_mb: float = typer.Option(DEFAULT_RESULT_CACHE_MAX_BYTES / (1024 * 1024), "--result-cache-max-mb", help="Evict the least recently used results beyond this size"),
+):
+    """
+    Test many SBOMs with Snyk concurrently, across one or more orgs.
+    """
+    import utils.snykApi as snykApi
+    from utils.sbomTestPoller import SbomTestPoller, SbomTestResult
+    from utils.testResultCache import TestResultCache, sbom_content_hash
+
+    if not source.exists():
+        typer.echo(f"Error testing SBOMs: input {source} does not exist", err=True)
+        raise typer.Exit(1)
+    try:
+        org_map = _load_org_map(org_map_file)
+    except (OSError, ValueError) as e:
+        typer.echo(f"Error testing SBOMs: {str(e)}", err=True)
+        raise typer.Exit(1)
+
+    # generate-sbom-batch leaves its summary next to the SBOMs
+    inputs = [path for path in _collect_batch_inputs(source, "*.json") if path.name != "summary.json"]
+    started = perf_counter()
+    submitted = []
+    sbom_hashes = {}
+    failed = 0
+    cache = None
+    if result_cache_file is not None:
+        cache = TestResultCache(result_cache_file, ttl=result_cache_ttl, max_bytes=int(result_cache_max_mb * 1024 * 1024))
+
+    with open(report_file, "w") as report:
+        def write_result(result, cached=False):
+            nonlocal failed
+            failed += result.error is not None
+            record = {"input": str(result.key), "org_id": result.org_id, "test_run_id": result.test_run_id,
+                      "status": result.status, "seconds": result.seconds}
+            if result.error is not None:
+                record["error"] = result.error
+                typer.echo(f"Error testing SBOM {result.key}: {result.error}", err=True)
+            else:
+                record["results"] = result.results
+                if cached:
+                    record["cached"] = True
+                elif cache is not None:
+                    cache.put(sbom_hashes[result.key], result.results)
+                typer.echo(f"Tested {result.key} in {result.seconds}s: {result.status}{' (cached)' if cached else ''}")
+            # Flush per line so the report can be followed while the batch runs
+            report.write(json.dumps(record) + "\n")
+            report.flush()
+
+        for input_file in inputs:
+            target_org_id = org_map.get(input_file.name, org_map.get(input_file.stem, org_id))
+            if target_org_id is None:
+                write_result(SbomTestResult(str(input_file), None, None, "error", error="No org ID for this SBOM in the org map and no --org-id given"))
+                continue
+            if cache is not None:
+                # Hash now but let the poller load the SBOM again on submission,
+                # so the whole batch is never held in memory at once
+                try:
+                    sbom_hash = sbom_content_hash(_load_sbom(input_file), target_org_id)
+                except (OSError, ValueError) as e:
+                    write_result(SbomTestResult(str(input_file), target_org_id, None, "error", error=str(e)))
+                    continue
+                cached_results = cache.get(sbom_hash)
+                if cached_results is not None:
+                    write_result(SbomTestResult(str(input_file), target_org_id, None, "finished", cached_results), cached=True)
+                    continue
+                sbom_hashes[str(input_file)] = sbom_hash
+            submitted.append((str(input_file), target_org_id, partial(_load_sbom, input_file)))
+
+        try:
+            poller = SbomTestPoller(snykApi.get_default_client(), max_concurrency=concurrency, timeout=poll_timeout,
+                                    max_poll_interval=max_poll_interval)
+            for result in poller.submit_and_poll(submitted):
+                write_result(result)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    typer.echo(f"Tested {len(inputs) - failed} of {len(inputs)} SBOMs in {round(perf_counter() - started, 4)}s, report: {report_file}")
+    if failed:
+        raise typer.Exit(1)
+
+@app.command()
+def diff_sbom(
+    old_file: Path = typer.Option(..., "--old", help="Previous CycloneDX SBOM JSON file"),
+    new_file: Path = typer.Option(..., "--new", help="New CycloneDX SBOM JSON file"),
+    output_file: Optional[Path] = typer.Option(None, "--output", "-o", help="Write the diff report JSON here instead of stdout"),
+    delta_file: Optional[Path] = typer.Option(None, "--delta", help="Write a CycloneDX document of only the added and changed components here"),
+    exit_code: bool = typer.Option(False, "--exit-code", help="Exit with status 1 when the SBOMs differ, like git diff --exit-code"),
+):
+    """
+    Report added, removed and version-changed components and dependency edges between two SBOMs.
+    """
+    from utils.sbomDiff import SbomIndex, delta_document, diff_sboms
+
+    try:
+        old_index = SbomIndex(_load_sbom(old_file))
+        new_sbom = _load_sbom(new_file)
+        new_index = SbomIndex(new_sbom)
+    except (OSError, ValueError, AttributeError) as e:
+        typer.echo(f"Error comparing SBOMs: {str(e)}", err=True)
+        raise typer.Exit(2)
+
+    diff = diff_sboms(old_index, new_index)
+    report = diff.to_dict()
+    if output_file is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(output_file, "w") as f:
+            json.dump(report, f, indent=2)
+    if delta_file is not None:
+        with open(delta_file, "w") as f:
+            json.dump(delta_document(new_sbom, old_index, new_index, diff), f, indent=2)
+
+    typer.echo(f"{len(diff.added)} added, {len(diff.removed)} removed, {len(diff.changed)} changed components; "
+               f"{len(diff.edges_added)} added, {len(diff.edges_removed)} removed dependency edges", err=True)
+    if exit_code and not diff.unchanged:
+        raise typer.Exit(1)
+
+def _iter_group_duplicate_rows(client, group_id: str, workers: int, stats: Dict) -> Iterator[Dict]:
+    """Crawl the cpp/nuget projects of every org in a group on a thread pool.
+
+    Each org's project pages are fed straight into a duplicate index, and its
+    conflicts are yielded as CSV rows as soon as that org is crawled, in
+    whatever order the orgs finish. An org that fails is counted and skipped.
+    If the consumer stops early (closing the generator), orgs not yet
+    started are cancelled and running crawls stop at their next project.
+    """
+    import itertools
+    import queue
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.helper import DuplicateProjectIndex, duplicate_project_csv_rows
+
+    rows = queue.Queue()
+    org_done = object()
+    stopped = threading.Event()
+
+    def crawl(org):
+        org_id = org['id']
+        org_name = (org.get('attributes') or {}).get('name')
+        try:
+            # The pool already keeps every connection busy, so no per-org prefetch thread
+            projects = itertools.takewhile(lambda _: not stopped.is_set(),
+                                           client.iter_cpp_snyk_projects(org_id, prefetch=False))
+            index = DuplicateProjectIndex().update(projects)
+            if stopped.is_set():
+                return
+            for newest, older in index.duplicates():
+                for row in duplicate_project_csv_rows(org_name, org_id, newest, older):
+                    rows.put(row)
+        except Exception as e:
+            stats["failed_orgs"].append(org_id)
+            print(f"Error crawling projects of org {org_id}: {str(e)}", file=sys.stderr)
+        finally:
+            rows.put(org_done)
+
+    listing_error = None
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='snyk-audit')
+    try:
+        try:
+            for org in client.iter_snyk_orgs(group_id):
+                executor.submit(crawl, org)
+                stats["orgs"] += 1
+        except Exception as e:
+            # Report the orgs already submitted before failing the audit
+            stats["failed_orgs"].append(group_id)
+            listing_error = e
+
+        pending = stats["orgs"]
+        while pending:
+            row = rows.get()
+            if row is org_done:
+                pending -= 1
+                continue
+            stats["conflicts"] += 1
+            yield row
+    finally:
+        # Only reached early when the consumer gave up, e.g. the CSV write failed
+        stopped.set()
+        executor.shutdown(cancel_futures=True)
+
+    if listing_error is not None:
+        raise listing_error
+
+@app.command()
+def audit_duplicate_projects(
+    group_id: str = typer.Option(..., "--group-id", "-g", help="Snyk group ID"),
+    output_file: Path = typer.Option(Path("dotnet-projects-to-be-disabled-or-deleted.csv"), "--output", "-o", help="CSV file of duplicate projects"),
+    workers: int = typer.Option(10, "--workers", "-w", help="Orgs crawled concurrently"),
+):
+    """
+    Find cpp/nuget projects duplicated across target runtimes in every org of a group.
+    """
+    import utils.snykApi as snykApi
+    from utils.helper import create_csv_file
+
+    started = perf_counter()
+    stats = {"orgs": 0, "conflicts": 0, "failed_orgs": []}
+    rows = _iter_group_duplicate_rows(snykApi.get_default_client(), group_id, workers, stats)
+    written = create_csv_file(rows, str(output_file))
+
+    typer.echo(f"Crawled {stats['orgs']} orgs in {round(perf_counter() - started, 4)}s, "
+               f"found {stats['conflicts']} duplicate projects, {len(stats['failed_orgs'])} failures")
+    if not written or stats["failed_orgs"]:
+        raise typer.Exit(1)
+
+def _load_onboardings(users_file: Path, group_id: str, default_role: Optional[str]) -> list:
+    """Read users to onboard from a CSV with email, user_id and optional org_id and role columns.
+
+    Rows without an org_id are added to the group itself, in which case the
+    role must be a group role ID.
+    """
+    import csv
+    from utils.onboarding import Onboarding
+
+    onboardings = []
+    with open(users_file, mode='r', newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            email, user_id = (row.get('email') or '').strip(), (row.get('user_id') or '').strip()
+            role = (row.get('role') or '').strip() or default_role
+            if not email or not user_id or not role:
+                raise ValueError(f"{users_file}:{line} needs an email, a user_id and a role (or --role)")
+            onboardings.append(Onboarding(email, user_id, group_id, (row.get('org_id') or '').strip() or None, role))
+    return onboardings
+
+@app.command()
+def onboard_users(
+    users_file: Path = typer.Option(..., "--input", "-i", help="CSV of users with email, user_id and optional org_id and role columns"),
+    group_id: str = typer.Option(..., "--group-id", "-g", help="Snyk group ID"),
+    role: Optional[str] = typer.Option(None, "--role", help="Role for rows without one (org role name, or group role ID for rows without an org_id)"),
+    workers: int = typer.Option(DEFAULT_ONBOARDING_WORKERS, "--workers", "-w", help="Membership calls in flight at once"),
+    membership_ttl: float = typer.Option(DEFAULT_MEMBERSHIP_TTL, "--membership-ttl", help="Seconds before an org's fetched memberships are fetched again"),
+):
+    """
+    Add users to Snyk orgs and the group, skipping existing members and pending invites.
+    """
+    import utils.snykApi as snykApi
+    from utils.onboarding import MembershipIndex, onboard_users as apply_onboardings
+
+    try:
+        onboardings = _load_onboardings(users_file, group_id, role)
+    except (OSError, ValueError) as e:
+        typer.echo(f"Error onboarding users: {str(e)}", err=True)
+        raise typer.Exit(1)
+
+    started = perf_counter()
+    client = snykApi.get_default_client()
+    index = MembershipIndex(client, ttl=membership_ttl)
+    counts = {"added": 0, "already_member": 0, "duplicate": 0, "failed": 0}
+    for result in apply_onboardings(client, onboardings, workers=workers, index=index):
+        counts[result.status] += 1
+        scope = result.onboarding.org_id or f"group {group_id}"
+        if result.error is not None:
+            typer.echo(f"Error onboarding {result.onboarding.email} to {scope}: {result.error}", err=True)
+        elif result.status == "added":
+            typer.echo(f"Added {result.onboarding.email} to {scope}")
+
+    typer.echo(f"Onboarded {len(onboardings)} users in {round(perf_counter() - started, 4)}s with {index.fetches} membership fetches: "
+               f"{counts['added']} added, {counts['already_member']} already members, {counts['duplicate']} duplicate rows, "
+               f"{counts['failed']} failures")
+    if counts["failed"]:
         raise typer.Exit(1)
 
 if __name__ == "__main__":
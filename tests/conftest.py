@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# utils is imported from the repository root, as index.py and the benchmarks do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
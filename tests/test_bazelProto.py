@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+from utils.bazelProto import iter_fields, iter_rules, read_varint
+
+# A build.proto Target for a rules_jvm_external jvm_import, written out field
+# by field as `bazel query --output=proto` encodes it: (key, length, value)
+RULE = (
+    b'\x0a\x1f' b'@maven//:com_google_guava_guava'  # Rule.name
+    b'\x12\x0a' b'jvm_import'  # Rule.rule_class
+    b'\x1a\x1e' b'/ob/external/maven/BUILD:12:11'  # Rule.location
+    b'\x22\x3b'  # Rule.attribute
+    b'\x0a\x04' b'tags' b'\x10\x05'  # name, type STRING_LIST
+    b'\x32\x31' b'maven_coordinates=com.google.guava:guava:31.1-jre'  # string_list_value
+    b'\x22\x31'  # Rule.attribute
+    b'\x0a\x04' b'deps' b'\x10\x06'  # name, type LABEL_LIST
+    b'\x32\x27' b'@maven//:com_google_guava_failureaccess'
+    b'\x22\x23'  # Rule.attribute, not asked for
+    b'\x0a\x0a' b'visibility' b'\x10\x06'
+    b'\x32\x13' b'//visibility:public'
+)
+# Target.type RULE, Target.rule (226 bytes, a two-byte length)
+RULE_TARGET = b'\x08\x01' b'\x12\xe2\x01' + RULE
+# Target.type SOURCE_FILE, Target.source_file with only its name
+SOURCE_FILE_TARGET = b'\x08\x02' b'\x1a\x11' b'\x0a\x0f' b'//app:Main.java'
+
+GUAVA = ('@maven//:com_google_guava_guava', 'jvm_import', {
+    'tags': ['maven_coordinates=com.google.guava:guava:31.1-jre'],
+    'deps': ['@maven//:com_google_guava_failureaccess'],
+})
+
+
+def test_read_varint():
+    assert read_varint(b'\x01', 0) == (1, 1)
+    # The protobuf encoding guide's example
+    assert read_varint(b'\xac\x02', 0) == (300, 2)
+    assert read_varint(b'\x00\xe2\x01', 1) == (226, 3)
+
+
+def test_iter_fields_reads_every_wire_type():
+    message = (b'\x08\x96\x01'  # 1: varint 150
+               b'\x11' + bytes(range(8)) +  # 2: fixed64
+               b'\x1a\x03abc'  # 3: length-delimited
+               b'\x25\x00\x00\x80\x3f')  # 4: fixed32 (1.0f)
+    fields = [(number, wire_type, bytes(value) if isinstance(value, memoryview) else value)
+              for number, wire_type, value in iter_fields(message)]
+    assert fields == [(1, 0, 150), (2, 1, bytes(range(8))), (3, 2, b'abc'), (4, 5, b'\x00\x00\x80\x3f')]
+
+
+def test_iter_fields_rejects_group_wire_types():
+    with pytest.raises(ValueError):
+        list(iter_fields(b'\x0b'))
+
+
+def test_iter_rules_proto():
+    # --output=proto: one QueryResult whose targets are repeated field 1
+    query_result = b'\x0a\xe7\x01' + RULE_TARGET + b'\x0a\x15' + SOURCE_FILE_TARGET
+    assert list(iter_rules(io.BytesIO(query_result), streamed=False)) == [GUAVA]
+
+
+def test_iter_rules_streamed_proto():
+    # --output=streamed_proto: varint length-prefixed Targets
+    streamed = b'\xe7\x01' + RULE_TARGET + b'\x15' + SOURCE_FILE_TARGET + b'\xe7\x01' + RULE_TARGET
+    assert list(iter_rules(io.BytesIO(streamed), streamed=True)) == [GUAVA, GUAVA]
+
+
+def test_iter_rules_truncated():
+    with pytest.raises(ValueError):
+        list(iter_rules(io.BytesIO(b'\xe7\x01' + RULE_TARGET[:-1]), streamed=True))
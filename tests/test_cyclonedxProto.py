@@ -0,0 +1,96 @@
+import io
+from struct import unpack
+
+from utils.bazelProto import iter_fields
+from utils.cyclonedxProto import encode_component, encode_dependency, encode_varint, write_bom_protobuf
+
+GUAVA = "pkg:maven/com.google.guava/guava@31.1-jre"
+FAILUREACCESS = "pkg:maven/com.google.guava/failureaccess@1.0.1"
+
+BOM = {
+    "bomFormat": "CycloneDX",
+    "specVersion": "1.6",
+    "version": 1,
+    "metadata": {
+        "timestamp": "2024-01-02T03:04:05Z",
+        "tools": [{"vendor": "Bazel", "name": "java-maven"}],
+        "lifecycles": [{"phase": "build"}],
+        "properties": [{"name": "build-system", "value": "bazel"}],
+    },
+    "components": [
+        {"type": "library", "group": "com.google.guava", "name": "guava", "version": "31.1-jre", "purl": GUAVA,
+         "evidence": {"identity": {"field": "purl", "confidence": 1.0}}},
+        {"type": "library", "group": "com.google.guava", "name": "failureaccess", "version": "1.0.1",
+         "purl": FAILUREACCESS},
+    ],
+    "dependencies": [{"ref": GUAVA, "dependsOn": [FAILUREACCESS]}],
+}
+
+
+def _message(value):
+    """Decode a length-delimited value into {field number: [values]}, nested messages left as bytes."""
+    fields = {}
+    for number, _, field_value in iter_fields(bytes(value)):
+        fields.setdefault(number, []).append(bytes(field_value) if isinstance(field_value, memoryview) else field_value)
+    return fields
+
+
+def test_encode_varint():
+    assert encode_varint(0) == b'\x00'
+    assert encode_varint(127) == b'\x7f'
+    # The protobuf encoding guide's example
+    assert encode_varint(300) == b'\xac\x02'
+
+
+def test_encode_component_matches_bom_proto():
+    # Field numbers from bom-1.6.proto's Component, Evidence and EvidenceIdentity
+    assert encode_component({"type": "library", "name": "a", "version": "1", "purl": "pkg:maven/g/a@1",
+                             "evidence": {"identity": {"field": "purl", "confidence": 1.0}}}) == (
+        b'\x08\x03'  # type: CLASSIFICATION_LIBRARY
+        b'\x1a\x0fpkg:maven/g/a@1'  # bom_ref, the purl
+        b'\x42\x01a'  # name
+        b'\x4a\x011'  # version
+        b'\x82\x01\x0fpkg:maven/g/a@1'  # purl, field 16: a two-byte key
+        b'\xba\x01\x09'  # evidence, field 23
+        b'\x1a\x07'  # identity
+        b'\x08\x04'  # field: EVIDENCE_FIELD_PURL
+        b'\x15\x00\x00\x80\x3f'  # confidence 1.0 as fixed32
+    )
+
+
+def test_encode_dependency_matches_bom_proto():
+    assert encode_dependency({"ref": "a", "dependsOn": ["b", "c"]}) == b'\x0a\x01a' b'\x12\x03\x0a\x01b' b'\x12\x03\x0a\x01c'
+
+
+def test_write_bom_protobuf_round_trip():
+    out = io.BytesIO()
+    write_bom_protobuf(BOM, out)
+    bom = _message(out.getvalue())
+
+    assert bom[1] == [b'1.6']
+    assert bom[2] == [1]
+    metadata = _message(bom[4][0])
+    assert _message(metadata[1][0]) == {1: [1704164645]}
+    assert _message(metadata[2][0]) == {1: [b'Bazel'], 2: [b'java-maven']}
+    assert _message(metadata[8][0]) == {1: [b'build-system'], 2: [b'bazel']}
+    assert _message(metadata[9][0]) == {1: [2]}
+
+    components = [_message(component) for component in bom[5]]
+    assert [component[16] for component in components] == [[GUAVA.encode()], [FAILUREACCESS.encode()]]
+    assert [component[3] for component in components] == [[GUAVA.encode()], [FAILUREACCESS.encode()]]
+    identity = _message(_message(components[0][23][0])[3][0])
+    assert identity[1] == [4]
+    assert unpack('<f', identity[2][0]) == (1.0,)
+    assert 23 not in components[1]
+
+    dependencies = [_message(dependency) for dependency in bom[8]]
+    assert dependencies == [{1: [GUAVA.encode()], 2: [b'\x0a' + bytes((len(FAILUREACCESS),)) + FAILUREACCESS.encode()]}]
+
+
+def test_write_bom_protobuf_streams_large_boms():
+    components = [{"type": "library", "name": f"a{index}", "version": "1", "purl": f"pkg:maven/g/a{index}@1"}
+                  for index in range(3000)]
+    out = io.BytesIO()
+    write_bom_protobuf({"specVersion": "1.4", "components": components}, out)
+    decoded = _message(out.getvalue())
+    assert [_message(component)[16][0].decode() for component in decoded[5]] == [c["purl"] for c in components]
@@ -0,0 +1,66 @@
+import pytest
+
+from utils.helper import DuplicateProjectIndex, find_duplicate_cpp_projects, parse_version_tuple
+
+
+def _project(project_id, runtime, name="app", target_file="app.csproj"):
+    return {"id": project_id, "attributes": {"name": name, "target_file": target_file, "target_reference": None,
+                                             "target_runtime": runtime, "created": f"{project_id}-created"}}
+
+
+@pytest.mark.parametrize("runtime, expected", [
+    ("net48", (0, 4, 8)),
+    ("net472", (0, 4, 7, 2)),
+    (".NETFramework,Version=v4.7.2", (0, 4, 7, 2)),
+    ("netstandard2.0", (1, 2, 0)),
+    ("netcoreapp3.1", (2, 3, 1)),
+    ("net8.0", (2, 8, 0)),
+    ("net8.0-windows", (2, 8, 0)),
+    ("v140", (140,)),
+])
+def test_parse_version_tuple(runtime, expected):
+    assert parse_version_tuple(runtime) == expected
+
+
+def test_target_frameworks_rank_by_family():
+    runtimes = ["net8.0", "net48", "netcoreapp3.1", "netstandard2.1", "net6.0", "net472"]
+    assert sorted(runtimes, key=parse_version_tuple) == [
+        "net472", "net48", "netstandard2.1", "netcoreapp3.1", "net6.0", "net8.0"]
+
+
+def test_duplicates_rank_the_highest_runtime_newest():
+    index = DuplicateProjectIndex().update([
+        _project("p-6", "net6.0"),
+        _project("p-48", "net48"),
+        _project("p-8", "net8.0"),
+        _project("other", "net48", name="other"),
+    ])
+    [(newest, older)] = index.duplicates()
+    assert newest.id == "p-8"
+    assert [variant.id for variant in older] == ["p-6", "p-48"]
+
+
+def test_duplicates_prefer_the_later_project_on_ties():
+    index = DuplicateProjectIndex().update([
+        _project("first", "net8.0"), _project("old", "net48"), _project("second", "net8.0")])
+    [(newest, older)] = index.duplicates()
+    # The other project on the newest runtime is not reported as older
+    assert newest.id == "second"
+    assert [variant.id for variant in older] == ["old"]
+
+
+def test_projects_without_a_runtime_are_skipped():
+    projects = [_project("missing", None), _project("p-48", "net48"), _project("p-8", "net8.0")]
+    del projects[0]["attributes"]["target_runtime"]
+    index = DuplicateProjectIndex().update(projects + [_project("null", None)])
+    assert index.skipped == 2
+    [(newest, older)] = index.duplicates()
+    assert (newest.id, [variant.id for variant in older]) == ("p-8", ["p-48"])
+
+
+def test_find_duplicate_cpp_projects_keeps_the_pair_shape():
+    [(old, new)] = find_duplicate_cpp_projects([_project("p-8", "net8.0"), _project("p-48", "net48")])
+    assert old == {"name": "app", "target_file": "app.csproj", "target_reference": None,
+                   "target_runtime": "net48", "created": "p-48-created", "id": "p-48"}
+    assert new["id"] == "p-8"
+    assert new["attributes"]["target_runtime"] == "net8.0"
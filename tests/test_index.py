@@ -0,0 +1,175 @@
+import io
+import json
+import threading
+from time import sleep
+
+import pytest
+from typer.testing import CliRunner
+
+import index
+import utils.snykApi as snykApi
+
+DEPS_XML = """<query version="2">
+  <rule class="jvm_import" name="@maven//:com_example_app">
+    <list name="tags"><string value="maven_coordinates=com.example:app:1.0"/></list>
+    <list name="deps"><label value="@maven//:com_example_lib"/></list>
+  </rule>
+  <rule class="jvm_import" name="@maven//:com_example_lib">
+    <list name="tags"><string value="maven_coordinates=com.example:lib:2.0"/></list>
+  </rule>
+</query>"""
+
+
+def _project(project_id, runtime):
+    return {"id": project_id, "attributes": {"name": "app", "target_file": "app.csproj", "target_reference": None,
+                                             "target_runtime": runtime, "created": None}}
+
+
+class AuditClient:
+    """A group of orgs that each hold one project duplicated across two runtimes."""
+
+    def __init__(self, orgs=40):
+        self.orgs = orgs
+        self.crawled = 0
+        self.lock = threading.Lock()
+
+    def iter_snyk_orgs(self, group_id):
+        for index_ in range(self.orgs):
+            yield {"id": f"org-{index_}", "attributes": {"name": f"Org {index_}"}}
+
+    def iter_cpp_snyk_projects(self, org_id, prefetch=True):
+        with self.lock:
+            self.crawled += 1
+        for project in (_project(f"{org_id}-old", "net48"), _project(f"{org_id}-new", "net8.0")):
+            sleep(0.01)
+            yield project
+
+
+def test_audit_fails_when_the_csv_cannot_be_written(monkeypatch, tmp_path):
+    client = AuditClient()
+    monkeypatch.setattr(snykApi, "get_default_client", lambda: client)
+    result = CliRunner().invoke(index.app, ["audit-duplicate-projects", "--group-id", "g",
+                                            "--output", str(tmp_path / "missing" / "out.csv")])
+    assert result.exit_code == 1
+    assert client.crawled == 0
+
+
+def test_audit_writes_every_duplicate(monkeypatch, tmp_path):
+    client = AuditClient(orgs=5)
+    monkeypatch.setattr(snykApi, "get_default_client", lambda: client)
+    output = tmp_path / "out.csv"
+    result = CliRunner().invoke(index.app, ["audit-duplicate-projects", "--group-id", "g", "--output", str(output)])
+    assert result.exit_code == 0
+    lines = output.read_text().splitlines()
+    assert len(lines) == 6
+    assert all(",net48,net8.0," in line for line in lines[1:])
+
+
+def test_closing_the_audit_rows_cancels_pending_orgs():
+    client = AuditClient(orgs=200)
+    stats = {"orgs": 0, "conflicts": 0, "failed_orgs": []}
+    rows = index._iter_group_duplicate_rows(client, "g", 4, stats)
+    next(rows)
+    rows.close()
+    assert client.crawled < 20
+
+
+def test_generated_boms_are_plain_json():
+    generator = index.CycloneDXGenerator(DEPS_XML)
+    bom = json.loads(json.dumps(generator.generate_1_6()))
+    assert [component["purl"] for component in bom["components"]] == [
+        "pkg:maven/com.example/app@1.0", "pkg:maven/com.example/lib@2.0"]
+    assert bom["components"][0]["properties"] == [{"name": "maven-central", "value": "true"}]
+    assert bom["dependencies"] == [{"ref": "pkg:maven/com.example/app@1.0",
+                                    "dependsOn": ["pkg:maven/com.example/lib@2.0"]}]
+    # Generating a later version never leaks evidence into earlier ones
+    assert "evidence" not in json.dumps(generator.generate_1_4())
+    assert generator.components[1] == {"type": "library", "name": "lib", "group": "com.example",
+                                       "version": "2.0", "purl": "pkg:maven/com.example/lib@2.0"}
+
+
+def test_rule_cache_is_rejected_for_other_input_formats(tmp_path):
+    result = CliRunner().invoke(index.app, ["generate-sbom", "--input", str(tmp_path / "MODULE.bazel.lock"),
+                                            "--output", "-", "--input-format", "lockfile",
+                                            "--cache", str(tmp_path / "rules.db")])
+    assert result.exit_code == 2
+    assert not (tmp_path / "rules.db").exists()
+
+
+def test_maven_label_replaces_unsafe_characters():
+    assert index.maven_label("com.google.guava", "guava") == "@maven//:com_google_guava_guava"
+    assert index.maven_label("org.scala-lang", "scala-library") == "@maven//:org_scala_lang_scala_library"
+
+
+def test_dependencies_resolve_through_rule_names_and_maven_labels():
+    deps_xml = """<query version="2">
+  <rule class="jvm_import" name="@maven//:com_example_app">
+    <list name="tags"><string value="maven_coordinates=com.example:app:1.0"/></list>
+    <list name="deps">
+      <label value="@maven//:com_example_lib"/>
+      <label value="@maven//:v2_plugin"/>
+      <label value="@maven//:not_imported"/>
+      <label value="//local:target"/>
+    </list>
+  </rule>
+  <rule class="jvm_import" name="@maven//:com_example_lib_2_0">
+    <list name="tags"><string value="maven_coordinates=com.example:lib:2.0"/></list>
+  </rule>
+  <rule class="jvm_import" name="@maven//:v2_plugin">
+    <list name="tags"><string value="maven_coordinates=com.example:plugin:3.0"/></list>
+  </rule>
+</query>"""
+    generator = index.CycloneDXGenerator(deps_xml)
+    # Dependencies declared before their rule are resolved once every component is known
+    assert generator.dependencies == [{"ref": "pkg:maven/com.example/app@1.0",
+                                       "dependsOn": ["pkg:maven/com.example/lib@2.0",
+                                                     "pkg:maven/com.example/plugin@3.0"]}]
+    assert generator.label_index["@maven//:com_example_lib_2_0"] == "pkg:maven/com.example/lib@2.0"
+    assert generator.label_index["@maven//:com_example_lib"] == "pkg:maven/com.example/lib@2.0"
+
+
+@pytest.mark.parametrize("spec_version", ["1.4", "1.5", "1.6"])
+def test_write_bom_json_matches_json_dumps(spec_version):
+    generator = index.CycloneDXGenerator(DEPS_XML)
+    bom = generator._bom(spec_version)
+    expected = generator._materialized_bom(spec_version)
+    expected["metadata"]["timestamp"] = bom["metadata"]["timestamp"]
+
+    out = io.StringIO()
+    index.write_bom_json(bom, out)
+    assert out.getvalue() == json.dumps(expected, indent=2)
+
+    out = io.StringIO()
+    index.write_bom_json(bom, out, compact=True)
+    assert out.getvalue() == json.dumps(expected, separators=(",", ":"))
+
+
+def test_write_bom_json_writes_empty_lists_inline():
+    bom = {"bomFormat": "CycloneDX", "components": [], "dependencies": []}
+    out = io.StringIO()
+    index.write_bom_json(bom, out)
+    assert out.getvalue() == json.dumps(bom, indent=2)
+
+
+def test_batch_outputs_of_one_directory_keep_their_stem(tmp_path):
+    inputs = [tmp_path / "deps.xml", tmp_path / "other.xml"]
+    assert index._batch_output_files(inputs, tmp_path / "out", tmp_path / "out" / "summary.json") == [
+        tmp_path / "out" / "deps.json", tmp_path / "out" / "other.json"]
+
+
+def test_batch_outputs_of_nested_inputs_join_their_directories(tmp_path):
+    inputs = [tmp_path / "pkg1" / "deps.xml", tmp_path / "pkg2" / "sub" / "deps.xml"]
+    assert index._batch_output_files(inputs, tmp_path / "out", tmp_path / "out" / "summary.json") == [
+        tmp_path / "out" / "pkg1__deps.json", tmp_path / "out" / "pkg2__sub__deps.json"]
+
+
+def test_batch_outputs_reject_collisions(tmp_path):
+    with pytest.raises(ValueError, match="the batch summary and the SBOM of"):
+        index._batch_output_files([tmp_path / "summary.xml"], tmp_path / "out", tmp_path / "out" / "summary.json")
+    with pytest.raises(ValueError, match="would both be written to"):
+        index._batch_output_files([tmp_path / "deps.xml", tmp_path / "deps.query"],
+                                  tmp_path / "out", tmp_path / "out" / "summary.json")
+
+
+def test_batch_outputs_of_no_inputs(tmp_path):
+    assert index._batch_output_files([], tmp_path, tmp_path / "summary.json") == []
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from utils.lockfile import iter_lockfile_records
+
+MAVEN_INSTALL_V1 = {
+    "dependency_tree": {
+        "dependencies": [
+            {"coord": "com.example:app:1.0", "directDependencies": ["com.example:lib:2.0"]},
+            {"coord": "com.example:lib:2.0", "dependencies": []},
+            {"coord": "com.example:lib:jar:sources:2.0", "dependencies": []},
+        ]
+    }
+}
+MAVEN_INSTALL_V2 = {
+    "version": "2",
+    "artifacts": {
+        "com.example:app": {"version": "1.0"},
+        "com.example:lib": {"version": "2.0"},
+        "com.example:lib:jar:sources": {"version": "2.0"},
+    },
+    "dependencies": {"com.example:app": ["com.example:lib"]},
+}
+EXPECTED = [("com.example:app:1.0", ["com.example:lib"]), ("com.example:lib:2.0", [])]
+
+
+def _module_lockfile(attributes):
+    return {
+        "lockFileVersion": 11,
+        "moduleExtensions": {
+            "@@rules_jvm_external~//:extensions.bzl%maven": {
+                "general": {"generatedRepoSpecs": {"maven": {"attributes": attributes}}}
+            }
+        },
+    }
+
+
+def _write(path, content):
+    path.write_text(json.dumps(content))
+    return path
+
+
+@pytest.mark.parametrize("maven_install", [MAVEN_INSTALL_V1, MAVEN_INSTALL_V2])
+def test_maven_install_json(tmp_path, maven_install):
+    assert list(iter_lockfile_records(_write(tmp_path / "maven_install.json", maven_install))) == EXPECTED
+
+
+def test_pinned_module_lockfile_reads_the_maven_install_json(tmp_path):
+    _write(tmp_path / "maven_install.json", MAVEN_INSTALL_V2)
+    lockfile = _write(tmp_path / "MODULE.bazel.lock",
+                      _module_lockfile({"maven_install_json": "@@//:maven_install.json"}))
+    assert list(iter_lockfile_records(lockfile)) == EXPECTED
+
+
+def test_pinned_module_lockfile_without_its_maven_install_json(tmp_path):
+    lockfile = _write(tmp_path / "MODULE.bazel.lock",
+                      _module_lockfile({"maven_install_json": "@@//:maven_install.json"}))
+    with pytest.raises(ValueError, match="was not found"):
+        list(iter_lockfile_records(lockfile))
+
+
+def test_unknown_repository(tmp_path):
+    lockfile = _write(tmp_path / "MODULE.bazel.lock", _module_lockfile({}))
+    with pytest.raises(ValueError, match="No rules_jvm_external repository named 'other'"):
+        list(iter_lockfile_records(lockfile, repo_name="other"))
+
+
+def test_unpinned_module_lockfile(tmp_path, capsys):
+    artifacts = [{"group": "com.example", "artifact": "lib", "version": "2.9"},
+                 {"group": "com.example", "artifact": "app", "version": "1.0"},
+                 {"group": "com.example", "artifact": "lib", "version": "2.10"},
+                 {"group": "com.example", "artifact": "lib", "version": "2.1"}]
+    lockfile = _write(tmp_path / "MODULE.bazel.lock",
+                      _module_lockfile({"artifacts": [json.dumps(artifact) for artifact in artifacts]}))
+    with pytest.raises(ValueError, match="is not pinned"):
+        list(iter_lockfile_records(lockfile))
+
+    # Each artifact once, at its highest requested version, without dependencies
+    assert list(iter_lockfile_records(lockfile, allow_unpinned=True)) == [
+        ("com.example:lib:2.10", None), ("com.example:app:1.0", None)]
+    assert "is not pinned" in capsys.readouterr().err
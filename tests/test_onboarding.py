@@ -0,0 +1,97 @@
+import threading
+from types import SimpleNamespace
+
+from utils.onboarding import MembershipIndex, Onboarding, membership_emails, onboard_users
+
+
+def _member(email):
+    return {"relationships": {"user": {"data": {"attributes": {"email": email}}}}}
+
+
+class OnboardingClient:
+    """Orgs and a group with fixed members; org-broken cannot be listed and org-full rejects additions."""
+
+    def __init__(self):
+        self.org_members = {"org-1": ["Alice@example.com"], "org-full": [], "org-broken": []}
+        self.group_members = {"group": ["bob@example.com"]}
+        self.listed = []
+        self.added = []
+        self.lock = threading.Lock()
+
+    def iter_org_memberships(self, org_id, prefetch=True):
+        with self.lock:
+            self.listed.append(("org", org_id))
+        if org_id == "org-broken":
+            raise RuntimeError("HTTP 500")
+        return [_member(email) for email in self.org_members[org_id]]
+
+    def get_pending_user_list(self, org_id):
+        return [{"attributes": {"email": "invited@example.com"}}]
+
+    def iter_group_memberships(self, group_id, prefetch=True):
+        with self.lock:
+            self.listed.append(("group", group_id))
+        return [_member(email) for email in self.group_members[group_id]]
+
+    def add_member_to_snyk_organization(self, group_id, org_id, user_id, role):
+        if org_id == "org-full":
+            return False, SimpleNamespace(status_code=422)
+        with self.lock:
+            self.added.append((org_id, user_id, role))
+        return True
+
+    def create_group_membership_for_user(self, group_id, role, user_id):
+        with self.lock:
+            self.added.append((group_id, user_id, role))
+
+
+def _onboarding(email, org_id="org-1", user_id=None):
+    return Onboarding(email, user_id or email.split("@")[0], "group", org_id, "collaborator")
+
+
+def test_membership_emails_include_pending_invites_lower_cased():
+    assert membership_emails([_member("A@Example.com"), {"relationships": {}}],
+                             [{"attributes": {"email": "B@example.com"}}]) == {"a@example.com", "b@example.com"}
+
+
+def test_membership_index_fetches_each_scope_once_until_the_ttl():
+    client = OnboardingClient()
+    index = MembershipIndex(client, ttl=3600)
+    assert index.contains("org", "org-1", "alice@EXAMPLE.com")
+    assert index.contains("org", "org-1", "invited@example.com")
+    assert not index.contains("org", "org-1", "carol@example.com")
+    index.add("org", "org-1", "Carol@example.com")
+    assert index.contains("org", "org-1", "carol@example.com")
+    assert (index.fetches, client.listed) == (1, [("org", "org-1")])
+
+    expired = MembershipIndex(client, ttl=0)
+    expired.emails("group", "group")
+    expired.emails("group", "group")
+    assert expired.fetches == 2
+
+
+def test_onboard_users_applies_only_missing_memberships():
+    client = OnboardingClient()
+    results = list(onboard_users(client, [
+        _onboarding("alice@example.com"),
+        _onboarding("carol@example.com"),
+        _onboarding("Carol@Example.com"),
+        _onboarding("carol@example.com", org_id=None),
+        _onboarding("bob@example.com", org_id=None),
+        _onboarding("dave@example.com", org_id="org-full"),
+        _onboarding("erin@example.com", org_id="org-broken"),
+    ], workers=4))
+    statuses = sorted((result.onboarding.email, result.onboarding.org_id or "group", result.status, result.error)
+                      for result in results)
+    assert statuses == [
+        ("Carol@Example.com", "org-1", "duplicate", None),
+        ("alice@example.com", "org-1", "already_member", None),
+        ("bob@example.com", "group", "already_member", None),
+        ("carol@example.com", "group", "added", None),
+        ("carol@example.com", "org-1", "added", None),
+        ("dave@example.com", "org-full", "failed", "Add member call failed: HTTP 422"),
+        ("erin@example.com", "org-broken", "failed", "Could not fetch memberships: HTTP 500"),
+    ]
+    assert sorted(client.added) == [("group", "carol", "collaborator"), ("org-1", "carol", "collaborator")]
+    # Every scope is listed once, however many users it has
+    assert sorted(client.listed) == [("group", "group"), ("org", "org-1"), ("org", "org-broken"), ("org", "org-full")]
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from time import time
+from types import SimpleNamespace
+
+import pytest
+
+import utils.rateLimit as rateLimit
+from utils.rateLimit import RateLimitScheduler, parse_rate_limit_reset, parse_retry_after
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("", None),
+    ("120", 120.0),
+    ("0.5", 0.5),
+    ("-3", 0.0),
+    ("soon", None),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert parse_retry_after(format_datetime(retry_at, usegmt=True)) == pytest.approx(90, abs=2)
+
+
+def test_parse_retry_after_past_http_date():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("", None),
+    ("30", 30.0),
+    ("-1", 0.0),
+    ("never", None),
+])
+def test_parse_rate_limit_reset_delta(value, expected):
+    assert parse_rate_limit_reset(value) == expected
+
+
+def test_parse_rate_limit_reset_epoch():
+    assert parse_rate_limit_reset(str(int(time()) + 60)) == pytest.approx(60, abs=2)
+    assert parse_rate_limit_reset(str(int(time()) - 60)) == 0.0
+
+
+def test_callers_queued_behind_a_429_are_spread_out(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(rateLimit, "monotonic", lambda: clock[0])
+    scheduler = RateLimitScheduler(rate=20.0, burst=20)
+    # The 429 halves the rate to 10/s and pauses everyone for 2 seconds
+    assert scheduler.observe(SimpleNamespace(status_code=429, headers={"Retry-After": "2"})) == 2.0
+    assert scheduler.rate == 10.0
+
+    clock[0] = 100.5
+    sends = [clock[0] + scheduler._reserve() for _ in range(10)]
+    assert sends == pytest.approx([102.0 + (n + 1) / 10 for n in range(10)])
+
+    # A caller arriving after the pause still queues behind them
+    clock[0] = 102.5
+    assert clock[0] + scheduler._reserve() == pytest.approx(103.1)
+
+
+def test_exhausted_remaining_blocks_until_reset(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(rateLimit, "monotonic", lambda: clock[0])
+    scheduler = RateLimitScheduler(rate=10.0, burst=10)
+    scheduler.observe(SimpleNamespace(status_code=200, headers={"X-RateLimit-Remaining": "0",
+                                                                "X-RateLimit-Reset": "3"}))
+    assert [scheduler._reserve() for _ in range(3)] == pytest.approx([3.1, 3.2, 3.3])
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+import utils.ruleCache as ruleCache
+from utils.ruleCache import RuleCache, is_jvm_import, iter_raw_rules, rule_key
+
+RULES = [
+    b'<rule class="jvm_import" location="/home/a/BUILD:1:1" name="@maven//:a">'
+    b'<list name="tags"><string value="maven_coordinates=com.example:a:1.0"/></list></rule>',
+    b'<rule class="alias" location="/home/a/BUILD:2:1" name="//:empty"/>',
+    b'<rule class="jvm_import" location="/home/a/BUILD:3:1" name="@maven//:b">'
+    b'<list name="tags"><string value="maven_coordinates=com.example:b:2.0"/></list></rule>',
+]
+QUERY_XML = b'<?xml version="1.1"?>\n<query version="2">\n' + b'\n'.join(RULES) + b'\n</query>\n'
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_iter_raw_rules_across_chunk_boundaries(monkeypatch, chunk_size):
+    monkeypatch.setattr(ruleCache, "CHUNK_SIZE", chunk_size)
+    assert list(iter_raw_rules(io.BytesIO(QUERY_XML))) == RULES
+
+
+def test_is_jvm_import_only_reads_the_start_tag():
+    assert [is_jvm_import(rule) for rule in RULES] == [True, False, True]
+    assert not is_jvm_import(b'<rule class="alias"><string value=\'class="jvm_import"\'/></rule>')
+
+
+def test_rule_key_ignores_where_the_rule_is_defined():
+    moved = RULES[0].replace(b'/home/a/BUILD:1:1', b'/ci/work/BUILD:40:5')
+    assert rule_key(moved) == rule_key(RULES[0])
+    generated = RULES[0].replace(b'</rule>', b'<string name="generator_location" value="/home/a/BUILD:1:1"/></rule>')
+    assert rule_key(generated) == rule_key(generated.replace(b'/home/a/', b'/ci/work/'))
+    assert rule_key(RULES[0].replace(b'a:1.0', b'a:1.1')) != rule_key(RULES[0])
+
+
+def _extract(rule):
+    name = rule.get("name")
+    return name, name.upper(), None
+
+
+def test_warm_run_is_answered_from_the_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(ruleCache, "LOOKUP_BATCH_SIZE", 1)
+    query_xml = QUERY_XML.replace(b'</query>', RULES[0] + b'\n</query>')
+    with RuleCache(tmp_path / "rules.db") as cache:
+        cold = list(cache.records(io.BytesIO(query_xml), _extract))
+    # The repeated rule is extracted once
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    extracted = []
+    with RuleCache(tmp_path / "rules.db") as cache:
+        warm = list(cache.records(io.BytesIO(query_xml), lambda rule: extracted.append(rule)))
+    assert warm == cold == [("@maven//:a", "@MAVEN//:A", None), ("@maven//:b", "@MAVEN//:B", None),
+                            ("@maven//:a", "@MAVEN//:A", None)]
+    assert (cache.hits, cache.misses, extracted) == (3, 0, [])
+
+
+def test_idle_entries_are_evicted(tmp_path):
+    with RuleCache(tmp_path / "rules.db", max_idle_runs=1) as cache:
+        list(cache.records(io.BytesIO(QUERY_XML), _extract))
+    only_b = b'<query>' + RULES[2] + b'</query>'
+    for _ in range(2):
+        with RuleCache(tmp_path / "rules.db", max_idle_runs=1) as cache:
+            list(cache.records(io.BytesIO(only_b), _extract))
+    with RuleCache(tmp_path / "rules.db", max_idle_runs=1) as cache:
+        list(cache.records(io.BytesIO(QUERY_XML), _extract))
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,76 @@
+import pytest
+
+from utils.sbomDiff import SbomIndex, delta_document, diff_sboms, split_purl
+
+
+@pytest.mark.parametrize("purl, expected", [
+    ("pkg:maven/com.google.guava/guava@31.1-jre", ("pkg:maven/com.google.guava/guava", "31.1-jre")),
+    ("pkg:maven/g/a@1.0?type=jar&classifier=sources", ("pkg:maven/g/a?type=jar&classifier=sources", "1.0")),
+    ("pkg:golang/example.com/mod@v1.2.3#sub/dir", ("pkg:golang/example.com/mod#sub/dir", "v1.2.3")),
+    ("pkg:npm/%40angular/core@17.0.0", ("pkg:npm/%40angular/core", "17.0.0")),
+    ("pkg:maven/g/a", ("pkg:maven/g/a", "")),
+    ("pkg:maven/g/a?repository_url=https://user@repo.example.com", ("pkg:maven/g/a?repository_url=https://user@repo.example.com", "")),
+])
+def test_split_purl(purl, expected):
+    assert split_purl(purl) == expected
+
+
+def _component(group, name, version):
+    return {"type": "library", "group": group, "name": name, "version": version,
+            "purl": f"pkg:maven/{group}/{name}@{version}"}
+
+
+def _sbom(components, dependencies):
+    return {"bomFormat": "CycloneDX", "specVersion": "1.5", "metadata": {"timestamp": "2024-01-01T00:00:00Z"},
+            "components": components, "dependencies": dependencies}
+
+
+GUAVA_OLD = _component("com.google.guava", "guava", "31.1-jre")
+GUAVA_NEW = _component("com.google.guava", "guava", "33.0.0-jre")
+FAILUREACCESS = _component("com.google.guava", "failureaccess", "1.0.1")
+JSR305 = _component("com.google.code.findbugs", "jsr305", "3.0.2")
+GSON = _component("com.google.code.gson", "gson", "2.10.1")
+
+OLD = _sbom([GUAVA_OLD, FAILUREACCESS, JSR305],
+            [{"ref": GUAVA_OLD["purl"], "dependsOn": [FAILUREACCESS["purl"], JSR305["purl"]]}])
+NEW = _sbom([GUAVA_NEW, FAILUREACCESS, GSON],
+            [{"ref": GUAVA_NEW["purl"], "dependsOn": [FAILUREACCESS["purl"], GSON["purl"]]}])
+
+
+def test_diff_sboms():
+    diff = diff_sboms(SbomIndex(OLD), SbomIndex(NEW))
+    assert diff.added == [GSON["purl"]]
+    assert diff.removed == [JSR305["purl"]]
+    # A version bump is a change, and guava's unchanged edge to failureaccess is not reported
+    assert diff.changed == [("pkg:maven/com.google.guava/guava", ["31.1-jre"], ["33.0.0-jre"])]
+    assert diff.edges_added == [("pkg:maven/com.google.guava/guava", "pkg:maven/com.google.code.gson/gson")]
+    assert diff.edges_removed == [("pkg:maven/com.google.guava/guava", "pkg:maven/com.google.code.findbugs/jsr305")]
+    assert not diff.unchanged
+
+
+def test_diff_sboms_unchanged():
+    # Order, metadata and bom-refs do not matter, only components and edges
+    reordered = _sbom([dict(component, **{"bom-ref": f"ref-{index}"}) for index, component in enumerate(reversed(OLD["components"]))],
+                      [{"ref": "ref-2", "dependsOn": ["ref-0", "ref-1"]}])
+    reordered["metadata"]["timestamp"] = "2025-01-01T00:00:00Z"
+    diff = diff_sboms(SbomIndex(OLD), SbomIndex(reordered))
+    assert diff.unchanged
+    assert diff.to_dict()["unchanged"] is True
+
+
+def test_diff_sboms_nested_and_purl_less_components():
+    old = _sbom([{"name": "app", "version": "1", "components": [{"group": "g", "name": "lib", "version": "1"}]}], [])
+    new = _sbom([{"name": "app", "version": "1", "components": [{"group": "g", "name": "lib", "version": "2"}]}], [])
+    diff = diff_sboms(SbomIndex(old), SbomIndex(new))
+    assert diff.changed == [("g/lib", ["1"], ["2"])]
+    assert diff.added == diff.removed == []
+
+
+def test_delta_document():
+    old, new = SbomIndex(OLD), SbomIndex(NEW)
+    diff = diff_sboms(old, new)
+    delta = delta_document(NEW, old, new, diff)
+    assert delta["specVersion"] == "1.5"
+    assert sorted(component["purl"] for component in delta["components"]) == sorted([GUAVA_NEW["purl"], GSON["purl"]])
+    assert delta["dependencies"] == NEW["dependencies"]
+    assert {"name": "sbom-delta:removed", "value": JSR305["purl"]} in delta["metadata"]["properties"]
@@ -0,0 +1,55 @@
+import threading
+
+from utils.sbomTestPoller import SbomTestPoller
+
+
+class FakeClient:
+    """Test runs that finish after a set number of status checks."""
+
+    def __init__(self, checks_until_done, final_status="finished"):
+        self.checks_until_done = checks_until_done
+        self.final_status = final_status
+        self.checks = {}
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def create_sbom_test_run(self, org_id, sbom):
+        with self.lock:
+            self.created += 1
+            return {"data": {"id": f"run-{sbom['name']}"}}
+
+    def get_sbom_test_run_status(self, org_id, test_run_id):
+        with self.lock:
+            self.checks[test_run_id] = self.checks.get(test_run_id, 0) + 1
+            done = self.checks[test_run_id] >= self.checks_until_done
+        return {"data": {"attributes": {"status": self.final_status if done else "processing"}}}
+
+    def get_sbom_test_run_results(self, org_id, test_run_id):
+        return {"run": test_run_id}
+
+
+def _poller(client, **kwargs):
+    return SbomTestPoller(client, max_concurrency=4, poll_interval=0.01, max_poll_interval=0.02, **kwargs)
+
+
+def test_poll_waits_for_every_run():
+    client = FakeClient(checks_until_done=3)
+    results = list(_poller(client).poll([(index, "org", f"run-{index}") for index in range(10)]))
+    assert sorted(result.key for result in results) == list(range(10))
+    assert all(result.status == "finished" and result.error is None for result in results)
+    assert all(result.results == {"run": result.test_run_id} and result.polls == 3 for result in results)
+
+
+def test_submit_and_poll_creates_runs_lazily():
+    client = FakeClient(checks_until_done=1)
+    results = list(_poller(client).submit_and_poll([(name, "org", lambda name=name: {"name": name}) for name in "abc"]))
+    assert client.created == 3
+    assert sorted(result.test_run_id for result in results) == ["run-a", "run-b", "run-c"]
+
+
+def test_failed_runs_and_timeouts_are_results_not_exceptions():
+    failed = list(_poller(FakeClient(checks_until_done=1, final_status="error")).poll([("a", "org", "run-a")]))
+    assert failed[0].status == "error" and failed[0].error
+
+    timed_out = list(_poller(FakeClient(checks_until_done=1000), timeout=0.05).poll([("a", "org", "run-a")]))
+    assert timed_out[0].status == "timeout"
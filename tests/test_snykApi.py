@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from mock_snyk_server import MockConfig, MockSnykServer  # noqa: E402
+from utils.rateLimit import RateLimitScheduler  # noqa: E402
+from utils.snykApi import SnykClient  # noqa: E402
+
+TOKEN = "00000000-0000-0000-0000-000000000000"
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**config):
+        server = MockSnykServer(MockConfig(retry_after=0.01, **config)).start()
+        servers.append(server)
+        scheduler = RateLimitScheduler(rate=1000, burst=100, base_delay=0.01, max_delay=0.05)
+        return server, SnykClient(token=TOKEN, base_url=server.url, scheduler=scheduler)
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_iter_snyk_rest_endpoint_follows_next_links(serve, prefetch):
+    server, client = serve(pages=4, page_size=25)
+    with client:
+        members = list(client.iter_org_memberships("org-1", prefetch=prefetch))
+    assert [member["id"] for member in members] == [f"org-1-org_membership-{index}" for index in range(100)]
+    assert server.counts["requests"] == 4
+
+
+def test_pagination_snyk_rest_endpoint_collects_every_page(serve):
+    _, client = serve(pages=3, page_size=10)
+    with client:
+        assert len(client.get_group_memberships("group-0")) == 30
+
+
+def test_throttled_and_failed_pages_are_retried(serve):
+    server, client = serve(pages=5, page_size=10, error_rate_429=0.2, error_rate_5xx=0.1, seed=3)
+    with client:
+        members = list(client.iter_org_memberships("org-1"))
+    assert len(members) == 50
+    assert server.counts["throttled"] + server.counts["errors"] > 0
+    assert server.counts["unmatched"] == 0
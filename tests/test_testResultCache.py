@@ -0,0 +1,49 @@
+from utils.testResultCache import sbom_content_hash
+# Imported under another name so pytest does not collect it as a test class
+from utils.testResultCache import TestResultCache as ResultCache
+
+SBOM = {
+    "bomFormat": "CycloneDX",
+    "specVersion": "1.4",
+    "serialNumber": "urn:uuid:1",
+    "version": 1,
+    "metadata": {"timestamp": "2024-01-01T00:00:00Z"},
+    "components": [{"purl": "pkg:maven/g/a@1"}, {"purl": "pkg:maven/g/b@1"}],
+    "dependencies": [{"ref": "pkg:maven/g/a@1", "dependsOn": ["pkg:maven/g/b@1"]}],
+}
+
+
+def test_sbom_content_hash_ignores_volatile_fields_and_order():
+    regenerated = dict(SBOM, serialNumber="urn:uuid:2", version=2, metadata={"timestamp": "2025-01-01T00:00:00Z"},
+                       components=list(reversed(SBOM["components"])))
+    assert sbom_content_hash(regenerated, "org") == sbom_content_hash(SBOM, "org")
+
+
+def test_sbom_content_hash_covers_components_edges_and_org():
+    bumped = dict(SBOM, components=[{"purl": "pkg:maven/g/a@2"}, {"purl": "pkg:maven/g/b@1"}])
+    no_edges = dict(SBOM, dependencies=[])
+    hashes = {sbom_content_hash(SBOM, "org"), sbom_content_hash(bumped, "org"),
+              sbom_content_hash(no_edges, "org"), sbom_content_hash(SBOM, "other-org")}
+    assert len(hashes) == 4
+
+
+def test_result_cache_round_trip_and_ttl(tmp_path):
+    with ResultCache(tmp_path / "results.db") as cache:
+        cache.put("hash", {"issues": 3})
+        assert cache.get("hash") == {"issues": 3}
+        assert cache.get("missing") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    with ResultCache(tmp_path / "results.db", ttl=-1) as cache:
+        assert cache.get("hash") is None
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    with ResultCache(tmp_path / "results.db", max_bytes=50) as cache:
+        cache.put("first", {"value": "x" * 10})
+        cache.put("second", {"value": "y" * 10})
+        cache.get("first")
+        cache.put("third", {"value": "z" * 10})
+        assert cache.get("second") is None
+        assert cache.get("first") is not None
+        assert cache.get("third") is not None
@@ -0,0 +1,175 @@
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+# Minimal protobuf wire-format reader for the parts of Bazel's build.proto
+# (src/main/protobuf/build.proto) that SBOM generation needs, so that
+# `bazel query --output=proto|streamed_proto` results can be read without a
+# protobuf runtime or generated code.
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LENGTH_DELIMITED = 2
+WIRE_FIXED32 = 5
+
+# QueryResult
+QUERY_RESULT_TARGET = 1
+# Target
+TARGET_RULE = 2
+# Rule
+RULE_NAME = 1
+RULE_CLASS = 2
+RULE_ATTRIBUTE = 4
+# Attribute
+ATTRIBUTE_NAME = 1
+ATTRIBUTE_STRING_VALUE = 5
+ATTRIBUTE_STRING_LIST_VALUE = 6
+
+# (rule name, rule class, {attribute name: string list}) for the attributes asked for
+DecodedRule = Tuple[str, str, Dict[str, List[str]]]
+
+
+def read_varint(buffer: bytes, position: int) -> Tuple[int, int]:
+    """Decode a varint at position, returning (value, next position)."""
+    result = 0
+    shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def iter_fields(buffer: bytes) -> Iterator[Tuple[int, int, object]]:
+    """Yield (field number, wire type, value) for every field of an encoded message.
+
+    Length-delimited values are returned as memoryview slices to avoid copies.
+    """
+    view = memoryview(buffer)
+    position = 0
+    end = len(buffer)
+    while position < end:
+        # Keys and most lengths fit in one byte; skip the general decoder for them
+        key = buffer[position]
+        if key < 0x80:
+            position += 1
+        else:
+            key, position = read_varint(buffer, position)
+        field_number, wire_type = key >> 3, key & 0x07
+        if wire_type == WIRE_VARINT:
+            value, position = read_varint(buffer, position)
+        elif wire_type == WIRE_LENGTH_DELIMITED:
+            length = buffer[position]
+            if length < 0x80:
+                position += 1
+            else:
+                length, position = read_varint(buffer, position)
+            value = view[position:position + length]
+            position += length
+        elif wire_type == WIRE_FIXED64:
+            value = view[position:position + 8]
+            position += 8
+        elif wire_type == WIRE_FIXED32:
+            value = view[position:position + 4]
+            position += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field_number, wire_type, value
+
+
+def _read_file_varint(fp: IO) -> Optional[int]:
+    """Read a varint from a binary file, or None at a clean end of file."""
+    result = 0
+    shift = 0
+    while True:
+        byte = fp.read(1)
+        if not byte:
+            if shift:
+                raise ValueError("Truncated varint in Bazel query proto output")
+            return None
+        result |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return result
+        shift += 7
+
+
+def _read_exact(fp: IO, length: int) -> bytes:
+    data = fp.read(length)
+    if len(data) != length:
+        raise ValueError("Truncated message in Bazel query proto output")
+    return data
+
+
+def iter_target_messages(fp: IO, streamed: bool) -> Iterator[bytes]:
+    """Yield encoded Target messages from a proto or streamed_proto query result file.
+
+    --output=proto writes one QueryResult whose targets are repeated field 1;
+    --output=streamed_proto writes varint length-delimited Target messages.
+    Either way targets are read one at a time, never the whole file at once.
+    """
+    while True:
+        if streamed:
+            length = _read_file_varint(fp)
+            if length is None:
+                return
+            yield _read_exact(fp, length)
+            continue
+
+        key = _read_file_varint(fp)
+        if key is None:
+            return
+        field_number, wire_type = key >> 3, key & 0x07
+        if wire_type != WIRE_LENGTH_DELIMITED:
+            raise ValueError(f"Unexpected wire type {wire_type} in QueryResult")
+        message = _read_exact(fp, _read_file_varint(fp))
+        if field_number == QUERY_RESULT_TARGET:
+            yield message
+
+
+def decode_rule(target: bytes, attribute_names: Tuple[str, ...]) -> Optional[DecodedRule]:
+    """Decode the rule of a Target message, keeping only the named attributes."""
+    rule = None
+    for field_number, wire_type, value in iter_fields(target):
+        if field_number == TARGET_RULE and wire_type == WIRE_LENGTH_DELIMITED:
+            rule = value
+    if rule is None:
+        return None
+
+    name = rule_class = ''
+    attributes = {}
+    for field_number, wire_type, value in iter_fields(rule):
+        if wire_type != WIRE_LENGTH_DELIMITED:
+            continue
+        if field_number == RULE_NAME:
+            name = str(value, 'utf-8')
+        elif field_number == RULE_CLASS:
+            rule_class = str(value, 'utf-8')
+        elif field_number == RULE_ATTRIBUTE:
+            attribute_name, strings = _decode_attribute(value, attribute_names)
+            if attribute_name is not None:
+                attributes[attribute_name] = strings
+    return name, rule_class, attributes
+
+
+def _decode_attribute(attribute: memoryview, attribute_names: Tuple[str, ...]) -> Tuple[Optional[str], List[str]]:
+    attribute_name = None
+    strings = []
+    for field_number, wire_type, value in iter_fields(attribute):
+        if wire_type != WIRE_LENGTH_DELIMITED:
+            continue
+        if field_number == ATTRIBUTE_NAME:
+            attribute_name = str(value, 'utf-8')
+            if attribute_name not in attribute_names:
+                return None, []
+        elif field_number in (ATTRIBUTE_STRING_LIST_VALUE, ATTRIBUTE_STRING_VALUE):
+            # LABEL_LIST attributes such as deps are also carried in string_list_value
+            strings.append(str(value, 'utf-8'))
+    return attribute_name, strings
+
+
+def iter_rules(fp: IO, streamed: bool, attribute_names: Tuple[str, ...] = ('tags', 'deps')) -> Iterator[DecodedRule]:
+    """Yield the decoded rules of a Bazel query proto or streamed_proto result file."""
+    for target in iter_target_messages(fp, streamed):
+        rule = decode_rule(target, attribute_names)
+        if rule is not None:
+            yield rule
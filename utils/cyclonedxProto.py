@@ -0,0 +1,191 @@
+from datetime import datetime, timezone
+from struct import pack
+from typing import IO, Dict, Iterable, List
+
+from utils import metrics
+from utils.bazelProto import WIRE_FIXED32, WIRE_LENGTH_DELIMITED, WIRE_VARINT
+
+# Minimal protobuf wire-format writer for the parts of CycloneDX's
+# bom-1.4/1.5/1.6.proto (github.com/CycloneDX/specification, schema/) that
+# SBOMs generated here use, so no protobuf runtime or generated code is
+# needed. The field numbers below are stable across those three versions.
+
+# Bom
+BOM_SPEC_VERSION = 1
+BOM_VERSION = 2
+BOM_SERIAL_NUMBER = 3
+BOM_METADATA = 4
+BOM_COMPONENTS = 5
+BOM_DEPENDENCIES = 8
+# Metadata
+METADATA_TIMESTAMP = 1
+METADATA_TOOLS = 2
+METADATA_PROPERTIES = 8
+METADATA_LIFECYCLES = 9
+# google.protobuf.Timestamp
+TIMESTAMP_SECONDS = 1
+TIMESTAMP_NANOS = 2
+# Tool
+TOOL_VENDOR = 1
+TOOL_NAME = 2
+TOOL_VERSION = 3
+# Lifecycles
+LIFECYCLES_PHASE = 1
+LIFECYCLES_NAME = 2
+# Property
+PROPERTY_NAME = 1
+PROPERTY_VALUE = 2
+# Component
+COMPONENT_TYPE = 1
+COMPONENT_BOM_REF = 3
+COMPONENT_GROUP = 7
+COMPONENT_NAME = 8
+COMPONENT_VERSION = 9
+COMPONENT_PURL = 16
+COMPONENT_PROPERTIES = 22
+COMPONENT_EVIDENCE = 23
+# Evidence
+EVIDENCE_IDENTITY = 3
+# EvidenceIdentity
+EVIDENCE_IDENTITY_FIELD = 1
+EVIDENCE_IDENTITY_CONFIDENCE = 2
+# Dependency
+DEPENDENCY_REF = 1
+DEPENDENCY_DEPENDENCIES = 2
+
+CLASSIFICATIONS = {
+    "application": 1, "framework": 2, "library": 3, "operating-system": 4, "device": 5, "file": 6,
+    "container": 7, "firmware": 8, "device-driver": 9, "platform": 10, "machine-learning-model": 11, "data": 12,
+    "cryptographic-asset": 13,
+}
+LIFECYCLE_PHASES = {
+    "design": 0, "pre-build": 1, "build": 2, "post-build": 3, "operations": 4, "discovery": 5, "decommission": 6,
+}
+EVIDENCE_FIELDS = {
+    "group": 1, "name": 2, "version": 3, "purl": 4, "cpe": 5, "swid": 6, "hash": 7,
+    # Not a CycloneDX field; the Maven coordinates identify the component the same way its purl does
+    "maven-coordinate": 4,
+}
+
+
+def encode_varint(value: int) -> bytes:
+    if value < 0x80:
+        return bytes((value,))
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _key(field_number: int, wire_type: int) -> bytes:
+    return encode_varint(field_number << 3 | wire_type)
+
+
+def _bytes_field(field_number: int, value: bytes) -> bytes:
+    return _key(field_number, WIRE_LENGTH_DELIMITED) + encode_varint(len(value)) + value
+
+
+def _string_field(field_number: int, value) -> bytes:
+    if value is None:
+        return b''
+    return _bytes_field(field_number, str(value).encode('utf-8'))
+
+
+def _varint_field(field_number: int, value: int) -> bytes:
+    return _key(field_number, WIRE_VARINT) + encode_varint(value)
+
+
+def _float_field(field_number: int, value: float) -> bytes:
+    return _key(field_number, WIRE_FIXED32) + pack('<f', value)
+
+
+def _timestamp(value: str) -> bytes:
+    moment = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return _varint_field(TIMESTAMP_SECONDS, int(moment.timestamp()))
+
+
+def _properties(field_number: int, properties: Iterable[Dict]) -> bytes:
+    return b''.join(
+        _bytes_field(field_number, _string_field(PROPERTY_NAME, prop.get("name")) + _string_field(PROPERTY_VALUE, prop.get("value")))
+        for prop in properties
+    )
+
+
+def encode_metadata(metadata: Dict) -> bytes:
+    out = []
+    if metadata.get("timestamp"):
+        out.append(_bytes_field(METADATA_TIMESTAMP, _timestamp(metadata["timestamp"])))
+    for tool in metadata.get("tools") or []:
+        # 1.5 made tools a single message, but with one legacy tool the encoding is the same
+        out.append(_bytes_field(METADATA_TOOLS, _string_field(TOOL_VENDOR, tool.get("vendor"))
+                                + _string_field(TOOL_NAME, tool.get("name"))
+                                + _string_field(TOOL_VERSION, tool.get("version"))))
+    out.append(_properties(METADATA_PROPERTIES, metadata.get("properties") or []))
+    for lifecycle in metadata.get("lifecycles") or []:
+        if lifecycle.get("phase") in LIFECYCLE_PHASES:
+            out.append(_bytes_field(METADATA_LIFECYCLES, _varint_field(LIFECYCLES_PHASE, LIFECYCLE_PHASES[lifecycle["phase"]])))
+        else:
+            out.append(_bytes_field(METADATA_LIFECYCLES, _string_field(LIFECYCLES_NAME, lifecycle.get("name"))))
+    return b''.join(out)
+
+
+def encode_component(component: Dict) -> bytes:
+    """Encode a component's CycloneDX JSON object; its purl doubles as the bom-ref dependencies point at."""
+    out = [
+        _varint_field(COMPONENT_TYPE, CLASSIFICATIONS[component.get("type", "library")]),
+        _string_field(COMPONENT_BOM_REF, component.get("bom-ref", component.get("purl"))),
+        _string_field(COMPONENT_GROUP, component.get("group")),
+        _string_field(COMPONENT_NAME, component.get("name")),
+        _string_field(COMPONENT_VERSION, component.get("version")),
+        _string_field(COMPONENT_PURL, component.get("purl")),
+        _properties(COMPONENT_PROPERTIES, component.get("properties") or []),
+    ]
+    identity = (component.get("evidence") or {}).get("identity")
+    if identity:
+        # 1.6 allows several identities; the JSON object form is a single one
+        for entry in identity if isinstance(identity, list) else [identity]:
+            encoded = _varint_field(EVIDENCE_IDENTITY_FIELD, EVIDENCE_FIELDS[entry["field"]])
+            if entry.get("confidence") is not None:
+                encoded += _float_field(EVIDENCE_IDENTITY_CONFIDENCE, entry["confidence"])
+            out.append(_bytes_field(COMPONENT_EVIDENCE, _bytes_field(EVIDENCE_IDENTITY, encoded)))
+    return b''.join(out)
+
+
+def encode_dependency(dependency: Dict) -> bytes:
+    return _string_field(DEPENDENCY_REF, dependency["ref"]) + b''.join(
+        _bytes_field(DEPENDENCY_DEPENDENCIES, _string_field(DEPENDENCY_REF, ref))
+        for ref in dependency.get("dependsOn") or []
+    )
+
+
+def write_bom_protobuf(bom: Dict, fp: IO) -> None:
+    """Write a BOM dict as a CycloneDX protobuf Bom message to a binary file handle.
+
+    Components and dependencies are repeated top-level fields, so each one
+    is encoded and written on its own and the whole message is never held
+    in memory.
+    """
+    with metrics.span("bom.serialize", format="protobuf"):
+        header = [_string_field(BOM_SPEC_VERSION, bom["specVersion"])]
+        if bom.get("version") is not None:
+            header.append(_varint_field(BOM_VERSION, bom["version"]))
+        if bom.get("serialNumber"):
+            header.append(_string_field(BOM_SERIAL_NUMBER, bom["serialNumber"]))
+        if bom.get("metadata"):
+            header.append(_bytes_field(BOM_METADATA, encode_metadata(bom["metadata"])))
+        fp.write(b''.join(header))
+
+        chunk: List[bytes] = []
+        for component in bom.get("components") or []:
+            chunk.append(_bytes_field(BOM_COMPONENTS, encode_component(component)))
+            if len(chunk) >= 1024:
+                fp.write(b''.join(chunk))
+                chunk.clear()
+        for dependency in bom.get("dependencies") or []:
+            chunk.append(_bytes_field(BOM_DEPENDENCIES, encode_dependency(dependency)))
+            if len(chunk) >= 1024:
+                fp.write(b''.join(chunk))
+                chunk.clear()
+        fp.write(b''.join(chunk))
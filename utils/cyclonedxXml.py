@@ -0,0 +1,110 @@
+from typing import IO, Dict, List
+from xml.sax.saxutils import escape, quoteattr
+
+from utils import metrics
+
+# Streaming writer for the CycloneDX XML encoding (bom-1.4/1.5/1.6.xsd) of
+# the BOM dicts built by CycloneDXGenerator. Elements are written in schema
+# sequence order, one component or dependency at a time.
+
+XML_NAMESPACE = "http://cyclonedx.org/schema/bom/{}"
+
+# Evidence identity fields are an enumeration in the schema
+EVIDENCE_FIELDS = {"group", "name", "version", "purl", "cpe", "swid", "hash"}
+
+
+def _element(name: str, value, indent: str) -> str:
+    if value is None:
+        return ''
+    return f"{indent}<{name}>{escape(str(value))}</{name}>"
+
+
+def _properties(properties: List[Dict], indent: str, step: str) -> List[str]:
+    if not properties:
+        return []
+    lines = [f"{indent}<properties>"]
+    lines.extend(f"{indent}{step}<property name={quoteattr(prop.get('name', ''))}>{escape(str(prop.get('value', '')))}</property>"
+                 for prop in properties)
+    lines.append(f"{indent}</properties>")
+    return lines
+
+
+def _metadata(metadata: Dict, indent: str, step: str, newline: str) -> str:
+    inner, deeper = indent + step, indent + step * 2
+    lines = [f"{indent}<metadata>"]
+    if metadata.get("timestamp"):
+        lines.append(_element("timestamp", metadata["timestamp"], inner))
+    if metadata.get("lifecycles"):
+        lines.append(f"{inner}<lifecycles>")
+        for lifecycle in metadata["lifecycles"]:
+            if "phase" in lifecycle:
+                lines.append(f"{deeper}<lifecycle>{_element('phase', lifecycle['phase'], '')}</lifecycle>")
+            else:
+                lines.append(f"{deeper}<lifecycle>{_element('name', lifecycle.get('name'), '')}</lifecycle>")
+        lines.append(f"{inner}</lifecycles>")
+    if metadata.get("tools"):
+        lines.append(f"{inner}<tools>")
+        for tool in metadata["tools"]:
+            fields = ''.join(_element(key, tool.get(key), '') for key in ("vendor", "name", "version"))
+            lines.append(f"{deeper}<tool>{fields}</tool>")
+        lines.append(f"{inner}</tools>")
+    lines.extend(_properties(metadata.get("properties"), inner, step))
+    lines.append(f"{indent}</metadata>")
+    return newline.join(lines)
+
+
+def component_xml(component: Dict, indent: str = '', step: str = '', newline: str = '') -> str:
+    """Render a component's CycloneDX JSON object as a <component>; its purl doubles as the bom-ref."""
+    inner = indent + step
+    bom_ref = component.get("bom-ref", component.get("purl"))
+    attributes = f" type={quoteattr(component.get('type', 'library'))}"
+    if bom_ref:
+        attributes += f" bom-ref={quoteattr(bom_ref)}"
+    lines = [f"{indent}<component{attributes}>"]
+    lines.extend(line for line in (_element(key, component.get(key), inner) for key in ("group", "name", "version", "purl")) if line)
+    lines.extend(_properties(component.get("properties"), inner, step))
+    identity = (component.get("evidence") or {}).get("identity")
+    if identity:
+        lines.append(f"{inner}<evidence>")
+        for entry in identity if isinstance(identity, list) else [identity]:
+            # Maven coordinates identify a component the same way its purl does
+            field = entry["field"] if entry["field"] in EVIDENCE_FIELDS else "purl"
+            fields = _element("field", field, '') + _element("confidence", entry.get("confidence"), '')
+            lines.append(f"{inner}{step}<identity>{fields}</identity>")
+        lines.append(f"{inner}</evidence>")
+    lines.append(f"{indent}</component>")
+    return newline.join(lines)
+
+
+def dependency_xml(dependency: Dict, indent: str = '', step: str = '', newline: str = '') -> str:
+    depends_on = dependency.get("dependsOn") or []
+    ref = quoteattr(dependency["ref"])
+    if not depends_on:
+        return f"{indent}<dependency ref={ref}/>"
+    lines = [f"{indent}<dependency ref={ref}>"]
+    lines.extend(f"{indent}{step}<dependency ref={quoteattr(target)}/>" for target in depends_on)
+    lines.append(f"{indent}</dependency>")
+    return newline.join(lines)
+
+
+def write_bom_xml(bom: Dict, fp: IO, compact: bool = False) -> None:
+    """Write a BOM dict as CycloneDX XML of its spec version to a text file handle, item by item."""
+    step, newline = ('', '') if compact else ('  ', '\n')
+    attributes = f" xmlns={quoteattr(XML_NAMESPACE.format(bom['specVersion']))}"
+    if bom.get("serialNumber"):
+        attributes += f" serialNumber={quoteattr(bom['serialNumber'])}"
+    attributes += f" version=\"{bom.get('version', 1)}\""
+
+    with metrics.span("bom.serialize", format="xml", compact=compact):
+        fp.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<bom{attributes}>')
+        if bom.get("metadata"):
+            fp.write(newline + _metadata(bom["metadata"], step, step, newline))
+        for key, render in (("components", component_xml), ("dependencies", dependency_xml)):
+            items = bom.get(key)
+            if not items:
+                continue
+            fp.write(f"{newline}{step}<{key}>")
+            for item in items:
+                fp.write(newline + render(item, step * 2, step, newline))
+            fp.write(f"{newline}{step}</{key}>")
+        fp.write(f"{newline}</bom>{newline}")
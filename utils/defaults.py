@@ -0,0 +1,17 @@
+# Defaults of options that index.py exposes on the command line. They live
+# here, apart from the modules that use them, so building the CLI does not
+# import those modules (and concurrent.futures or sqlite3 with them).
+
+# utils.sbomTestPoller
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_MAX_POLL_INTERVAL = 30.0
+DEFAULT_POLL_TIMEOUT = 1800.0
+
+# utils.testResultCache
+DEFAULT_RESULT_CACHE_TTL = 24 * 60 * 60
+DEFAULT_RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# utils.onboarding
+DEFAULT_MEMBERSHIP_TTL = 300.0
+DEFAULT_ONBOARDING_WORKERS = 10
@@ -5,6 +5,8 @@ import os
 import re
 import sys
 from collections import defaultdict
+from functools import lru_cache
+from typing import NamedTuple, Optional
 
 def check_user_membership(user_email: str, membership_data: list) -> bool:
     return any(
@@ -16,20 +18,20 @@ def get_snyk_token():
     SNYK_TOKEN = check_if_snyk_token_exist()
     
     pattern = re.compile(r'([\d\w]{8}-[\d\w]{4}-[\d\w]{4}-[\d\w]{4}-[\d\w]{12})')
-    if pattern.fullmatch(SNYK_TOKEN) == None:
-        print("Snyk token is not defined or not valid.")
-        sys.exit()
+    if not SNYK_TOKEN or pattern.fullmatch(SNYK_TOKEN) == None:
+        print("Snyk token is not defined or not valid.", file=sys.stderr)
+        sys.exit(1)
     else:
         return SNYK_TOKEN
 
 def check_if_snyk_token_exist():
-    print("Checking for Snyk token environment variable")
+    print("Checking for Snyk token environment variable", file=sys.stderr)
     try:
         if os.environ.get('SNYK_TOKEN'):
-            print("Found snyk token")
+            print("Found snyk token", file=sys.stderr)
             return os.getenv('SNYK_TOKEN')
     except:
-        print("Snyk token does not exist")
+        print("Snyk token does not exist", file=sys.stderr)
         sys.exit()
         
 def check_dry_run_variable(dryRun):
@@ -57,7 +59,31 @@ def compare_dates(date_str_1, date_str_2):
 
 def parse_version(version):
     # Extract numeric parts of targetframework
-    return [int(part) for part in re.findall(r'\d+', version)]
+    return list(parse_version_tuple(version))
+
+
+# .NET target frameworks ("net48", "netcoreapp3.1", "net8.0-windows", ".NETFramework,Version=v4.7.2")
+TARGET_FRAMEWORK_PATTERN = re.compile(r'^\.?(netcoreapp|netstandard|netframework|net)(?:,version=v)?(\d+(?:\.\d+)*)', re.IGNORECASE)
+# .NET Framework < .NET Standard < .NET Core and .NET 5+
+TARGET_FRAMEWORK_FAMILIES = {'netframework': 0, 'netstandard': 1, 'netcoreapp': 2}
+
+
+@lru_cache(maxsize=4096)
+def parse_version_tuple(version):
+    # A handful of distinct runtimes cover every project, so parse each once.
+    # .NET frameworks rank by family first: net48 is (0, 4, 8) and sorts
+    # below net8.0, which is (2, 8, 0). Other runtimes are their numbers.
+    match = TARGET_FRAMEWORK_PATTERN.match(version)
+    if match is None:
+        return tuple(int(part) for part in re.findall(r'\d+', version))
+    family, number = match.group(1).lower(), match.group(2)
+    if family == 'net':
+        # Framework monikers run their digits together (net472); net5.0 on uses dots
+        parts = number.split('.') if '.' in number else list(number)
+        family = 'netframework' if int(parts[0]) < 5 else 'netcoreapp'
+    else:
+        parts = number.split('.')
+    return (TARGET_FRAMEWORK_FAMILIES[family],) + tuple(int(part) for part in parts)
 
 
 def return_targetframework_data(project_1, project_2):
@@ -102,8 +128,9 @@ def get_created_date(project_data):
         return None
     
           
-def create_csv_file(data):
-    csv_file_path = 'dotnet-projects-to-be-disabled-or-deleted.csv'
+def create_csv_file(data, csv_file_path='dotnet-projects-to-be-disabled-or-deleted.csv'):
+    # data may be a generator; rows are written as it produces them, and it is
+    # closed if writing fails. Returns whether the whole file was written.
     try:
         print(f'Creating {csv_file_path}')
         with open(csv_file_path, mode='w', newline='', encoding='utf-8') as file:
@@ -141,8 +168,12 @@ def create_csv_file(data):
                 writer.writerow([organization_name, organization_id, old_project_id, new_project_id, old_project_name, new_project_name, old_project_target_file, new_project_target_file, old_project_targetframework, new_project_targetframework, old_project_create_date, new_project_create_data])
 
         print(f"Data written to {csv_file_path} successfully.")
+        return True
     except Exception as e:
-        print(f"Failed to create {csv_file_path}. An error occurred: {e}")
+        print(f"Failed to create {csv_file_path}. An error occurred: {e}", file=sys.stderr)
+        if hasattr(data, 'close'):
+            data.close()
+        return False
 
 
 def get_targetframework(project_data):
@@ -153,30 +184,121 @@ def get_targetframework(project_data):
     else:
         return None        
         
-def find_duplicate_cpp_projects(projects_data):
-    print('Comparing project data...')
-    seen = {}
-    conflicts = []
+class ProjectVariant(NamedTuple):
+    """The fields of a project that duplicate detection and the CSV report need."""
+    id: str
+    name: str
+    target_file: str
+    target_reference: Optional[str]
+    target_runtime: str
+    created: Optional[str]
+    version: tuple
+
+
+class DuplicateProjectIndex:
+    """Groups projects by (name, target_file, target_reference) in a single streaming pass.
+
+    Only a slim ProjectVariant with interned strings is kept per project, and
+    a key with a single project holds it directly instead of in a list, so a
+    million-project export fits in a few hundred MB. Runtimes are parsed once
+    into sortable version tuples.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.skipped = 0
 
-    for project in projects_data:
+    def add(self, project):
         attrs = project["attributes"]
-        key = (attrs["name"], attrs["target_file"], attrs["target_reference"])
-        # Check if target runtime exist
-        if "target_runtime" in attrs:
-            runtime = attrs["target_runtime"]
-            
-            if key in seen:
-                # Check for different target_runtime
-                if seen[key]["target_runtime"] != runtime:
-                    conflicts.append((seen[key], project))
-            else:
-                seen[key] = {**attrs, "id": project["id"]}  # Include the ID in the same dictionary
+        # Check if target runtime exist; the API returns null for projects without one
+        if attrs.get("target_runtime") is None:
+            self.skipped += 1
+            print(f"Target Runtime doesn't exist for {attrs['name']}, skipping comparision")
+            return
+
+        runtime = sys.intern(attrs["target_runtime"])
+        variant = ProjectVariant(
+            project["id"], sys.intern(attrs["name"]), sys.intern(attrs["target_file"]),
+            sys.intern(attrs["target_reference"]) if attrs["target_reference"] else attrs["target_reference"],
+            runtime, attrs.get("created"), parse_version_tuple(runtime)
+        )
+        key = (variant.name, variant.target_file, variant.target_reference)
+        existing = self.groups.get(key)
+        if existing is None:
+            self.groups[key] = variant
+        elif isinstance(existing, list):
+            existing.append(variant)
         else:
-            print(f"Target Runtime doesn't exist for {project['attributes']['name']}, skipping comparision")
+            self.groups[key] = [existing, variant]
+
+    def update(self, projects_data):
+        for project in projects_data:
+            self.add(project)
+        return self
+
+    def duplicates(self):
+        """Yield (newest variant, older variants) for every key seen with more than one target runtime.
+
+        The newest is the highest runtime version, with .NET Core and .NET 5+
+        above .NET Standard above .NET Framework, and the later project on ties.
+        Older variants are all projects of the key on a different runtime,
+        newest first.
+        """
+        for variants in self.groups.values():
+            if not isinstance(variants, list):
+                continue
+            # Stable sort on the reversed list puts the later project first on ties
+            ordered = sorted(reversed(variants), key=lambda variant: variant.version, reverse=True)
+            newest = ordered[0]
+            older = [variant for variant in ordered[1:] if variant.target_runtime != newest.target_runtime]
+            if older:
+                yield newest, older
+
+
+def find_duplicate_cpp_projects(projects_data):
+    """Return (older attributes with id, newest project) pairs for projects seen on several runtimes.
 
+    Kept for callers of the original report; the pairs come from
+    DuplicateProjectIndex, so the newest variant is ranked by runtime.
+    """
+    print('Comparing project data...')
+    conflicts = []
+    for newest, older in DuplicateProjectIndex().update(projects_data).duplicates():
+        newest_project = {"id": newest.id, "attributes": _variant_attributes(newest)}
+        for old in older:
+            conflicts.append(({**_variant_attributes(old), "id": old.id}, newest_project))
     return conflicts
 
 
+def _variant_attributes(variant):
+    return {
+        "name": variant.name,
+        "target_file": variant.target_file,
+        "target_reference": variant.target_reference,
+        "target_runtime": variant.target_runtime,
+        "created": variant.created,
+    }
+
+
+def duplicate_project_csv_rows(org_name, org_id, newest, older):
+    """Turn a duplicated project's variants into create_csv_file rows, one per older variant."""
+    for old in older:
+        yield {
+            'Organization Name': org_name,
+            'Organization ID': org_id,
+            'Old Project ID': old.id,
+            'New Project ID': newest.id,
+            'Old Project Name': old.name,
+            'New Project Name': newest.name,
+            'Old Project Target file': old.target_file,
+            'New Project Target file': newest.target_file,
+            'Old Project TargetFramework': old.target_runtime,
+            'New Project TargetFramework': newest.target_runtime,
+            'Old Project Created Date': old.created,
+            'New Project Created Date': newest.created,
+        }
+
+
 # Check if the file exists at the provided path
 def check_csv_file_exists(file_path):
     if os.path.exists(file_path):
@@ -0,0 +1,117 @@
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# (maven coordinates "group:artifact:version", versionless "group:artifact" deps or None)
+LockfileRecord = Tuple[str, Optional[List[str]]]
+
+
+def is_bazel_module_lockfile(lockfile: Dict) -> bool:
+    return "lockFileVersion" in lockfile and "moduleExtensions" in lockfile
+
+
+def _versionless(coordinates: str) -> str:
+    """Return "group:artifact" for any Maven coordinate string."""
+    return ":".join(coordinates.split(":")[:2])
+
+
+def iter_maven_install_records(maven_install: Dict) -> Iterator[LockfileRecord]:
+    """Yield artifacts and their direct dependencies from a rules_jvm_external maven_install.json."""
+    if "dependency_tree" in maven_install:
+        # Version 1 lock file: one entry per resolved coordinate
+        for artifact in maven_install["dependency_tree"].get("dependencies", []):
+            coordinates = artifact.get("coord", "")
+            if len(coordinates.split(":")) != 3:
+                # Classifier artifacts (sources, javadoc, natives) are not separate components
+                continue
+            direct = artifact.get("directDependencies", artifact.get("dependencies", []))
+            yield coordinates, [_versionless(dep) for dep in direct]
+        return
+
+    # Version 2 lock file: artifacts keyed by group:artifact, edges keyed the same way
+    dependencies = maven_install.get("dependencies", {})
+    for key, artifact in maven_install.get("artifacts", {}).items():
+        if len(key.split(":")) != 2 or "version" not in artifact:
+            continue
+        yield f"{key}:{artifact['version']}", [_versionless(dep) for dep in dependencies.get(key, [])]
+
+
+def _find_maven_repo_spec(module_lockfile: Dict, repo_name: str) -> Optional[Dict]:
+    for extension_id, extension in module_lockfile.get("moduleExtensions", {}).items():
+        if not extension_id.endswith("%maven"):
+            continue
+        for variant in extension.values():
+            spec = variant.get("generatedRepoSpecs", {}).get(repo_name)
+            if spec is not None:
+                return spec
+    return None
+
+
+def _resolve_workspace_file(label: str, workspace_root: Path) -> Optional[Path]:
+    """Resolve a root module file label such as @@//:maven_install.json to a path."""
+    for prefix in ("@@//", "@//", "//"):
+        if label.startswith(prefix):
+            package, _, name = label[len(prefix):].partition(":")
+            return workspace_root / package / name
+    return None
+
+
+def _version_key(version: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+def iter_module_lockfile_records(module_lockfile: Dict, repo_name: str, workspace_root: Path,
+                                 allow_unpinned: bool = False) -> Iterator[LockfileRecord]:
+    """Yield the Maven artifacts a MODULE.bazel.lock records for a rules_jvm_external repo.
+
+    A pinned repo points at its maven_install.json, which carries the full
+    resolved graph. An unpinned repo only records the requested artifacts,
+    possibly several versions of one, and no dependency edges, so it is an
+    error unless allow_unpinned is set. Then each group:artifact is yielded
+    once, at its highest requested version (as Coursier would resolve it),
+    without dependencies.
+    """
+    spec = _find_maven_repo_spec(module_lockfile, repo_name)
+    if spec is None:
+        raise ValueError(f"No rules_jvm_external repository named '{repo_name}' in the module lock file")
+
+    attributes = spec.get("attributes", {})
+    pinned = attributes.get("maven_install_json")
+    if pinned:
+        pinned_path = _resolve_workspace_file(pinned, workspace_root)
+        if pinned_path is None or not pinned_path.exists():
+            raise ValueError(f"Repository '{repo_name}' is pinned to {pinned}, which was not found next to the lock file")
+        with open(pinned_path, "r") as f:
+            yield from iter_maven_install_records(json.load(f))
+        return
+
+    if not allow_unpinned:
+        raise ValueError(f"Repository '{repo_name}' is not pinned, so the lock file only lists its requested artifacts "
+                         f"and not the resolved dependency graph. Pin it with `bazel run @{repo_name}//:pin`, or pass "
+                         f"--allow-unpinned for an SBOM of the requested artifacts without dependencies")
+    print(f"Warning: repository '{repo_name}' is not pinned; the SBOM lists its requested artifacts "
+          f"without dependencies, which may differ from what Bazel resolves", file=sys.stderr)
+
+    # group:artifact -> highest requested version, in first-requested order
+    versions: Dict[str, str] = {}
+    for artifact in attributes.get("artifacts", []):
+        artifact = json.loads(artifact)
+        key = f"{artifact['group']}:{artifact['artifact']}"
+        if key not in versions or _version_key(artifact['version']) > _version_key(versions[key]):
+            versions[key] = artifact['version']
+    for key, version in versions.items():
+        yield f"{key}:{version}", None
+
+
+def iter_lockfile_records(lockfile_path: Path, repo_name: str = "maven",
+                          allow_unpinned: bool = False) -> Iterator[LockfileRecord]:
+    """Yield Maven artifacts from a MODULE.bazel.lock or a maven_install.json lock file."""
+    with open(lockfile_path, "r") as f:
+        lockfile = json.load(f)
+
+    if is_bazel_module_lockfile(lockfile):
+        yield from iter_module_lockfile_records(lockfile, repo_name, Path(lockfile_path).parent, allow_unpinned)
+    else:
+        yield from iter_maven_install_records(lockfile)
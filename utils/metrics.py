@@ -0,0 +1,215 @@
+import json
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+# Recording is off unless a command enables it, and every hook below is then
+# a cheap no-op, so instrumented code paths cost nothing in normal runs.
+_recorder = None
+# The Snyk request the current thread is sending, for the scheduler to report into
+_current = threading.local()
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class MetricsRecorder:
+    """Collects timed spans and Snyk API request records for one command run."""
+
+    def __init__(self, command: Optional[str] = None):
+        self.command = command
+        self.started_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self.started = perf_counter()
+        self.spans = []
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def _offset(self, started: float) -> float:
+        return round(started - self.started, 6)
+
+    def add_span(self, name: str, started: float, seconds: float, attributes: Optional[Dict] = None) -> None:
+        span = {"name": name, "start": self._offset(started), "seconds": round(seconds, 6),
+                "thread": threading.current_thread().name}
+        if attributes:
+            span["attributes"] = attributes
+        with self._lock:
+            self.spans.append(span)
+
+    def add_request(self, call: Dict) -> None:
+        with self._lock:
+            self.requests.append(call)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            spans, requests = list(self.spans), list(self.requests)
+        span_totals = {}
+        for span in spans:
+            total = span_totals.setdefault(span["name"], {"count": 0, "seconds": 0.0})
+            total["count"] += 1
+            total["seconds"] += span["seconds"]
+        for total in span_totals.values():
+            total["seconds"] = round(total["seconds"], 6)
+
+        statuses = {}
+        for call in requests:
+            status = str(call["status"]) if call["status"] is not None else call.get("error", "error")
+            statuses[status] = statuses.get(status, 0) + 1
+        latencies = [call["seconds"] for call in requests]
+        return {
+            "seconds": round(perf_counter() - self.started, 6),
+            "spans": span_totals,
+            "requests": {
+                "count": len(requests),
+                "statuses": statuses,
+                "retries": sum(call["retries"] for call in requests),
+                "rate_limit_wait_seconds": round(sum(call["rate_limit_wait_seconds"] for call in requests), 6),
+                "backoff_seconds": round(sum(call["backoff_seconds"] for call in requests), 6),
+                "p50_seconds": _percentile(latencies, 0.5) if latencies else None,
+                "p99_seconds": _percentile(latencies, 0.99) if latencies else None,
+                "max_seconds": max(latencies) if latencies else None,
+            },
+        }
+
+    def to_dict(self) -> Dict:
+        summary = self.summary()
+        with self._lock:
+            return {"command": self.command, "started_at": self.started_at, "summary": summary,
+                    "spans": list(self.spans), "requests": list(self.requests)}
+
+    def write(self, path) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def get_recorder() -> Optional[MetricsRecorder]:
+    return _recorder
+
+
+@contextmanager
+def _span(recorder: MetricsRecorder, name: str, attributes: Dict):
+    started = perf_counter()
+    try:
+        yield attributes
+    finally:
+        recorder.add_span(name, started, perf_counter() - started, attributes)
+
+
+def span(name: str, **attributes):
+    """Time a block as a named span. The yielded dict can be filled with attributes while it runs."""
+    recorder = _recorder
+    if recorder is None:
+        return nullcontext(attributes)
+    return _span(recorder, name, attributes)
+
+
+def timed_iter(name: str, iterable: Iterable) -> Iterator:
+    """Record one span holding the total time spent producing the items of an iterable.
+
+    Used for streaming stages, where the work happens inside next() calls
+    interleaved with the consumer's own work.
+    """
+    recorder = _recorder
+    if recorder is None:
+        return iter(iterable)
+    return _timed_iter(recorder, name, iterable)
+
+
+def _timed_iter(recorder: MetricsRecorder, name: str, iterable: Iterable) -> Iterator:
+    iterator = iter(iterable)
+    started = perf_counter()
+    seconds = 0.0
+    items = 0
+    try:
+        while True:
+            before = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                seconds += perf_counter() - before
+                return
+            seconds += perf_counter() - before
+            items += 1
+            yield item
+    finally:
+        recorder.add_span(name, started, seconds, {"items": items})
+
+
+@contextmanager
+def request_span(method: str, url: str):
+    """Record one Snyk API call: latency, final status, retries and time held by the rate limiter.
+
+    Yields the call record, or None when recording is off. The caller sets
+    its status; the scheduler adds waits and retries through note_rate_limit_wait
+    and note_retry.
+    """
+    recorder = _recorder
+    if recorder is None:
+        yield None
+        return
+    # Query strings carry only versions and pagination cursors
+    call = {"method": method.upper(), "endpoint": urlsplit(url).path, "status": None, "retries": 0,
+            "rate_limit_wait_seconds": 0.0, "backoff_seconds": 0.0}
+    previous = getattr(_current, "call", None)
+    _current.call = call
+    started = perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        call["error"] = type(e).__name__
+        raise
+    finally:
+        _current.call = previous
+        call["start"] = recorder._offset(started)
+        call["seconds"] = round(perf_counter() - started, 6)
+        call["rate_limit_wait_seconds"] = round(call["rate_limit_wait_seconds"], 6)
+        call["backoff_seconds"] = round(call["backoff_seconds"], 6)
+        recorder.add_request(call)
+
+
+def note_rate_limit_wait(seconds: float) -> None:
+    call = getattr(_current, "call", None)
+    if call is not None:
+        call["rate_limit_wait_seconds"] += seconds
+
+
+def note_retry(backoff_seconds: float) -> None:
+    call = getattr(_current, "call", None)
+    if call is not None:
+        call["retries"] += 1
+        call["backoff_seconds"] += backoff_seconds
+
+
+@contextmanager
+def recording(command: Optional[str] = None, metrics_out=None, profile_out=None):
+    """Enable recording for a command run and write the JSON trace and cProfile dump when it ends.
+
+    Does nothing unless metrics_out or profile_out is given. The files are
+    written even if the command fails, since slow failing runs need them most.
+    """
+    global _recorder
+    if metrics_out is None and profile_out is None:
+        yield None
+        return
+
+    profiler = None
+    if profile_out is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+    recorder = MetricsRecorder(command)
+    _recorder = recorder
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield recorder
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(profile_out))
+        _recorder = None
+        if metrics_out is not None:
+            recorder.write(metrics_out)
@@ -0,0 +1,160 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import monotonic
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+
+from utils.defaults import DEFAULT_MEMBERSHIP_TTL, DEFAULT_ONBOARDING_WORKERS
+
+
+def _membership_email(member) -> Optional[str]:
+    try:
+        return member['relationships']['user']['data']['attributes']['email']
+    except (KeyError, TypeError):
+        return None
+
+
+def _invite_email(invite) -> Optional[str]:
+    try:
+        return invite['attributes']['email']
+    except (KeyError, TypeError):
+        return None
+
+
+def membership_emails(membership_data, pending_invites=()) -> Set[str]:
+    """Return the lower-cased emails of members and pending invitees, for O(1) membership checks."""
+    emails = {_membership_email(member) for member in membership_data}
+    emails.update(_invite_email(invite) for invite in pending_invites)
+    emails.discard(None)
+    return {email.lower() for email in emails}
+
+
+class MembershipIndex:
+    """Email sets of org and group members, fetched once per scope and refreshed after ttl seconds.
+
+    An org's set covers its members and pending invites; a group's covers its
+    members. Scopes are fetched at most once at a time even when many threads
+    ask for the same one.
+    """
+
+    def __init__(self, client, ttl: float = DEFAULT_MEMBERSHIP_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.fetches = 0
+        self._lock = threading.Lock()
+        # (scope, id) -> (fetched at, emails)
+        self._entries = {}
+        self._scope_locks = {}
+
+    def _fetch(self, scope: str, scope_id: str) -> Set[str]:
+        self.fetches += 1
+        if scope == 'org':
+            return membership_emails(self.client.iter_org_memberships(scope_id, prefetch=False),
+                                     self.client.get_pending_user_list(scope_id))
+        return membership_emails(self.client.iter_group_memberships(scope_id, prefetch=False))
+
+    def emails(self, scope: str, scope_id: str) -> Set[str]:
+        key = (scope, scope_id)
+        with self._lock:
+            scope_lock = self._scope_locks.setdefault(key, threading.Lock())
+        with scope_lock:
+            entry = self._entries.get(key)
+            if entry is None or monotonic() - entry[0] > self.ttl:
+                entry = (monotonic(), self._fetch(scope, scope_id))
+                self._entries[key] = entry
+            return entry[1]
+
+    def contains(self, scope: str, scope_id: str, email: str) -> bool:
+        return email.lower() in self.emails(scope, scope_id)
+
+    def add(self, scope: str, scope_id: str, email: str) -> None:
+        """Record a membership just created, so it is not applied twice before the next refresh."""
+        with self._lock:
+            entry = self._entries.get((scope, scope_id))
+            if entry is not None:
+                entry[1].add(email.lower())
+
+
+class Onboarding(NamedTuple):
+    """One user to add to an org (with org_id) or to the group (without)."""
+    email: str
+    user_id: str
+    group_id: str
+    org_id: Optional[str]
+    role: str
+
+
+class OnboardingResult(NamedTuple):
+    onboarding: Onboarding
+    status: str  # 'added', 'already_member', 'duplicate' or 'failed'
+    error: Optional[str] = None
+
+
+def _scope(onboarding: Onboarding) -> Tuple[str, str]:
+    if onboarding.org_id:
+        return 'org', onboarding.org_id
+    return 'group', onboarding.group_id
+
+
+def onboard_users(client, onboardings: Iterable[Onboarding], workers: int = DEFAULT_ONBOARDING_WORKERS,
+                  index: Optional[MembershipIndex] = None) -> Iterator[OnboardingResult]:
+    """Apply only the missing memberships, concurrently, yielding a result per user as it completes.
+
+    Memberships are fetched once per org or group up front (in parallel),
+    not once per user. Org memberships go through the v1 add-member call,
+    group memberships through the REST group membership endpoint with the
+    role as a role ID. Repeated rows for the same email and org or group
+    are reported as 'duplicate' and never submitted, so one user is not
+    added twice concurrently.
+    """
+    index = index or MembershipIndex(client)
+    unique, duplicates, seen = [], [], set()
+    for onboarding in onboardings:
+        key = (onboarding.email.lower(), _scope(onboarding))
+        if key in seen:
+            duplicates.append(onboarding)
+        else:
+            seen.add(key)
+            unique.append(onboarding)
+    onboardings = unique
+    for onboarding in duplicates:
+        yield OnboardingResult(onboarding, 'duplicate')
+
+    def apply(onboarding: Onboarding) -> OnboardingResult:
+        scope, scope_id = _scope(onboarding)
+        if index.contains(scope, scope_id, onboarding.email):
+            return OnboardingResult(onboarding, 'already_member')
+        if scope == 'org':
+            response = client.add_member_to_snyk_organization(onboarding.group_id, onboarding.org_id,
+                                                              onboarding.user_id, onboarding.role)
+            if response is not True:
+                _, error = response
+                detail = f"HTTP {error.status_code}" if hasattr(error, 'status_code') else str(error)
+                return OnboardingResult(onboarding, 'failed', f"Add member call failed: {detail}")
+        else:
+            client.create_group_membership_for_user(onboarding.group_id, onboarding.role, onboarding.user_id)
+        index.add(scope, scope_id, onboarding.email)
+        return OnboardingResult(onboarding, 'added')
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='snyk-onboard') as executor:
+        scopes = {_scope(onboarding) for onboarding in onboardings}
+        prefetched: Dict = {executor.submit(index.emails, *scope): scope for scope in scopes}
+        failed_scopes = {}
+        for future in as_completed(prefetched):
+            try:
+                future.result()
+            except Exception as e:
+                failed_scopes[prefetched[future]] = str(e)
+
+        futures = {}
+        for onboarding in onboardings:
+            error = failed_scopes.get(_scope(onboarding))
+            if error is not None:
+                # Without the member list we cannot tell what is missing; touch nothing
+                yield OnboardingResult(onboarding, 'failed', f"Could not fetch memberships: {error}")
+            else:
+                futures[executor.submit(apply, onboarding)] = onboarding
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield OnboardingResult(futures[future], 'failed', str(e))
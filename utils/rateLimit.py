@@ -0,0 +1,194 @@
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep, time
+
+import requests
+
+from utils import metrics
+
+# Snyk allows 1620 REST requests per minute per token; stay just under that
+DEFAULT_RATE = 25.0
+DEFAULT_BURST = 25
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds of a Retry-After header (seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def parse_rate_limit_reset(value):
+    """Return seconds until an X-RateLimit-Reset value, which is either a delta or an epoch time."""
+    if not value:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    # Anything this large is a Unix timestamp rather than a number of seconds
+    if reset > 1e9:
+        reset -= time()
+    return max(0.0, reset)
+
+
+class RateLimitScheduler:
+    """Token bucket that every Snyk request goes through.
+
+    The bucket refills at `rate` requests per second up to `burst`. It adapts
+    to the server: a 429 or an exhausted X-RateLimit-Remaining pauses all
+    callers until the advertised reset and halves the rate, and successful
+    responses slowly raise it back to the configured maximum. Failed or
+    throttled requests are retried with jittered exponential backoff.
+
+    State is guarded by a lock that is only held to reserve a slot, never
+    while sleeping, so one scheduler can be shared by many threads (the
+    async client runs its calls on a thread pool, so it goes through here too).
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._blocked_until = 0.0
+
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _reserve(self):
+        """Take a token and return how long the caller must wait before sending."""
+        with self._lock:
+            now = monotonic()
+            # The refill clock is pushed past a pause, so no tokens accrue while blocked
+            self._tokens = min(self.burst, self._tokens + max(0.0, now - self._updated) * self.rate)
+            self._updated = max(self._updated, now)
+            # Tokens may go negative: later callers queue up behind earlier ones
+            self._tokens -= 1
+            wait = max(0.0, self._blocked_until - now) + max(0.0, -self._tokens) / self.rate
+            self.requests += 1
+            self.wait_seconds += wait
+            return wait
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            metrics.note_rate_limit_wait(wait)
+            sleep(wait)
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff delay for a retry attempt (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def observe(self, response):
+        """Adapt the bucket to a response's status and rate-limit headers.
+
+        Returns the server-requested delay in seconds, if any.
+        """
+        headers = response.headers
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        remaining = headers.get('X-RateLimit-Remaining')
+        remaining = int(remaining) if remaining and remaining.isdigit() else None
+        reset = parse_rate_limit_reset(headers.get('X-RateLimit-Reset'))
+
+        with self._lock:
+            now = monotonic()
+            if response.status_code == 429:
+                self.throttled += 1
+                self.rate = max(self.max_rate / 32, self.rate / 2)
+                pause = retry_after if retry_after is not None else reset
+                if pause is None:
+                    pause = self.backoff(self.throttled)
+                self._block(now + pause)
+                return pause
+
+            if remaining is not None and reset is not None:
+                if remaining <= 0:
+                    self._block(now + reset)
+                elif reset > 0:
+                    # Spread what is left of the window evenly over the time until it resets
+                    self.rate = min(self.max_rate, max(remaining / reset, self.max_rate / 32))
+            elif self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+            return retry_after
+
+    def _block(self, until):
+        """Hold every caller until `until`, then release them at the current rate.
+
+        Must be called with the lock held. The bucket is emptied and its
+        refill clock moved to the end of the pause, so queued callers are
+        spaced 1/rate apart after it instead of all firing at once.
+        """
+        self._blocked_until = max(self._blocked_until, until)
+        self._tokens = min(self._tokens, 0.0)
+        self._updated = max(self._updated, self._blocked_until)
+
+    def send(self, request, *args, **kwargs):
+        """Send a request through the bucket, retrying throttled, 5xx and failed calls.
+
+        `request` is called with args/kwargs and must return a requests.Response.
+        The final response is returned even if it is still an error status, so
+        callers keep control of raise_for_status().
+        """
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                response = request(*args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                print(f"Attempt {attempt + 1} failed: {e}")
+                self._retry_sleep(attempt, None)
+                attempt += 1
+                continue
+
+            server_delay = self.observe(response)
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response
+            if response.status_code == 429:
+                # The bucket now holds every caller until the server's reset
+                print(f"Rate limit exceeded. Retrying in {server_delay:.1f} seconds.")
+                self._retry_sleep(attempt, None, jitter=False)
+            else:
+                self._retry_sleep(attempt, server_delay)
+            attempt += 1
+
+    def _retry_sleep(self, attempt, server_delay, jitter=True):
+        with self._lock:
+            self.retries += 1
+        delay = max(self.backoff(attempt) if jitter else 0.0, server_delay or 0.0)
+        metrics.note_retry(delay)
+        if delay:
+            sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "rate": round(self.rate, 3),
+            }
@@ -0,0 +1,175 @@
+import hashlib
+import marshal
+import re
+import sqlite3
+import sys
+import xml.etree.ElementTree as ET
+from typing import IO, Callable, Iterator, Optional
+
+# Bump when the extracted record layout changes so stale entries are dropped.
+# Records are plain tuples of strings (rule label, Maven coordinates, dep
+# labels) stored with marshal, whose format is tied to the Python version.
+CACHE_FORMAT = f"3-py{sys.version_info[0]}.{sys.version_info[1]}"
+
+RULE_START = b'<rule '
+RULE_END = b'</rule>'
+SELF_CLOSING_END = b'/>'
+CHUNK_SIZE = 1 << 20
+# Rules looked up per query; stays under SQLite's default limit of 999 parameters
+LOOKUP_BATCH_SIZE = 500
+# Where a rule is defined (absolute BUILD path, line and column) differs across
+# machines and output bases and shifts with unrelated edits, but never changes
+# the extracted record, so it is left out of the cache key
+LOCATION_ATTRIBUTE = re.compile(rb' location="[^"]*"')
+GENERATOR_LOCATION = re.compile(rb'<string name="generator_location" value="[^"]*"/>')
+
+
+def iter_raw_rules(bazel_deps_file: IO) -> Iterator[bytes]:
+    """Yield the raw bytes of each <rule> element in a Bazel query XML file.
+
+    The file is scanned textually, without an XML parser, so that unchanged
+    rules can be recognised by their content hash before anything is parsed.
+    """
+    buffer = b''
+    position = 0
+    eof = False
+    while True:
+        start = buffer.find(RULE_START, position)
+        if start != -1:
+            # '<' cannot appear inside attribute values, so the start tag ends
+            # at the last '>' before the next '<'
+            next_tag = buffer.find(b'<', start + 1)
+            if next_tag != -1 or eof:
+                tag_end = buffer.rfind(b'>', start, next_tag if next_tag != -1 else len(buffer))
+                if tag_end != -1 and buffer[tag_end - 1:tag_end + 1] == SELF_CLOSING_END:
+                    position = tag_end + 1
+                    yield buffer[start:position]
+                    continue
+                end = buffer.find(RULE_END, start)
+                if end != -1:
+                    position = end + len(RULE_END)
+                    yield buffer[start:position]
+                    continue
+            if eof:
+                return
+            position = start
+        elif eof:
+            return
+        else:
+            # Keep a tail in case a start tag straddles the chunk boundary
+            position = max(position, len(buffer) - len(RULE_START))
+
+        chunk = bazel_deps_file.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def is_jvm_import(raw_rule: bytes) -> bool:
+    """Cheaply check the class attribute of a raw rule start tag."""
+    header_end = raw_rule.find(b'<', 1)
+    return b'class="jvm_import"' in raw_rule[:header_end if header_end != -1 else len(raw_rule)]
+
+
+def rule_key(raw_rule: bytes) -> str:
+    """Hash a raw rule for the cache, ignoring where it is defined."""
+    header_end = raw_rule.find(b'>')
+    key = LOCATION_ATTRIBUTE.sub(b'', raw_rule[:header_end], 1) + raw_rule[header_end:]
+    if b'generator_location' in key:
+        key = GENERATOR_LOCATION.sub(b'', key)
+    return hashlib.blake2b(key, digest_size=20).hexdigest()
+
+
+class RuleCache:
+    """On-disk cache of extracted rule records keyed by a hash of the raw rule XML, minus its location.
+
+    Every open/close of the cache counts as one run. Entries that have not
+    been read or written for more than max_idle_runs runs are evicted on close.
+    """
+
+    def __init__(self, path, max_idle_runs: int = 10):
+        self.max_idle_runs = max_idle_runs
+        self.hits = 0
+        self.misses = 0
+        self._touched = set()
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS rules (hash TEXT PRIMARY KEY, record BLOB)")
+        # Kept apart from the records so marking entries as used does not rewrite them
+        self.connection.execute("CREATE TABLE IF NOT EXISTS usage (hash TEXT PRIMARY KEY, last_run INTEGER)")
+        meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        if meta.get("format") != CACHE_FORMAT:
+            self.connection.execute("DELETE FROM rules")
+            self.connection.execute("DELETE FROM usage")
+        self.run = int(meta.get("run", 0)) + 1 if meta.get("format") == CACHE_FORMAT else 1
+        # Records extracted this run, by hash, until close() writes them
+        self._added = {}
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("format", CACHE_FORMAT), ("run", str(self.run))]
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def records(self, bazel_deps_file: IO, extract: Callable[[ET.Element], Optional[tuple]]) -> Iterator[tuple]:
+        """Yield extracted records for every jvm_import rule, parsing only rules not in the cache."""
+        batch = []
+        for raw_rule in iter_raw_rules(bazel_deps_file):
+            if is_jvm_import(raw_rule):
+                batch.append(raw_rule)
+                if len(batch) == LOOKUP_BATCH_SIZE:
+                    yield from self._batch_records(batch, extract)
+                    batch = []
+        if batch:
+            yield from self._batch_records(batch, extract)
+
+    def _lookup(self, rule_hashes) -> dict:
+        """Return the cached records of the given hashes, in one indexed query."""
+        placeholders = ", ".join("?" * len(rule_hashes))
+        return dict(self.connection.execute(
+            f"SELECT hash, record FROM rules WHERE hash IN ({placeholders})", rule_hashes
+        ))
+
+    def _batch_records(self, raw_rules, extract) -> Iterator[tuple]:
+        rule_hashes = [rule_key(raw_rule) for raw_rule in raw_rules]
+        entries = self._lookup(list(set(rule_hashes)))
+        for raw_rule, rule_hash in zip(raw_rules, rule_hashes):
+            cached = entries.get(rule_hash)
+            if cached is not None:
+                self.hits += 1
+                self._touched.add(rule_hash)
+                record = marshal.loads(cached)
+            else:
+                cached = self._added.get(rule_hash)
+                if cached is not None:
+                    # A duplicate of a rule first extracted earlier in this run
+                    self.hits += 1
+                    record = marshal.loads(cached)
+                else:
+                    self.misses += 1
+                    record = extract(ET.fromstring(raw_rule))
+                    self._added[rule_hash] = marshal.dumps(record)
+
+            if record is not None:
+                yield tuple(record)
+
+    def close(self) -> None:
+        """Record this run's hits, evict idle entries and persist the cache."""
+        self.connection.executemany(
+            "UPDATE usage SET last_run = ? WHERE hash = ?",
+            ((self.run, rule_hash) for rule_hash in self._touched)
+        )
+        self.connection.executemany("INSERT OR REPLACE INTO rules (hash, record) VALUES (?, ?)", self._added.items())
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO usage (hash, last_run) VALUES (?, ?)",
+            ((rule_hash, self.run) for rule_hash in self._added)
+        )
+        self.connection.execute("DELETE FROM usage WHERE last_run < ?", (self.run - self.max_idle_runs,))
+        self.connection.execute("DELETE FROM rules WHERE hash NOT IN (SELECT hash FROM usage)")
+        self.connection.commit()
+        self.connection.close()
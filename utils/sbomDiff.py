@@ -0,0 +1,166 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Set, Tuple
+
+
+def split_purl(purl: str) -> Tuple[str, str]:
+    """Split a package URL into its versionless identity and its version.
+
+    Qualifiers and subpath stay in the identity, since they name a different
+    artifact of the same package. Namespaces never hold a raw '@' (it is
+    percent-encoded in purls), so the last '@' starts the version.
+    """
+    end = len(purl)
+    for separator in ('#', '?'):
+        position = purl.find(separator)
+        if position != -1:
+            end = min(end, position)
+    base, at, version = purl[:end].rpartition('@')
+    if not at:
+        return purl, ''
+    return base + purl[end:], version
+
+
+def _iter_components(components) -> Iterator[Dict]:
+    """Yield components depth first, including those nested under other components."""
+    for component in components or ():
+        yield component
+        if component.get('components'):
+            yield from _iter_components(component['components'])
+
+
+class SbomIndex:
+    """A CycloneDX SBOM (1.4 to 1.6) indexed by versionless component identity.
+
+    Identities come from the purl, or from group and name for components
+    without one. Dependency edges are stored between identities, so a
+    version bump does not show up as every edge of the component changing.
+    """
+
+    def __init__(self, sbom: Dict):
+        # identity -> version -> component object
+        self.components: Dict[str, Dict[str, Dict]] = {}
+        # bom-ref or purl -> identity, to resolve dependency refs
+        refs: Dict[str, str] = {}
+        self.refs = refs
+        for component in _iter_components(sbom.get('components')):
+            purl = component.get('purl')
+            if purl:
+                identity, version = split_purl(purl)
+                refs[purl] = identity
+            else:
+                identity = f"{component.get('group') or ''}/{component.get('name') or ''}"
+                version = component.get('version') or ''
+            self.components.setdefault(identity, {})[version] = component
+            if component.get('bom-ref'):
+                refs[component['bom-ref']] = identity
+
+        # identity -> dependency identities
+        self.edges: Dict[str, Set[str]] = {}
+        for dependency in sbom.get('dependencies') or []:
+            targets = self.edges.setdefault(self.identity(dependency.get('ref')), set())
+            for target in dependency.get('dependsOn') or ():
+                # Nearly every ref names a listed component; resolve those with a single lookup
+                targets.add(refs.get(target) or self.identity(target))
+
+    def identity(self, ref: str) -> str:
+        """Resolve a dependency ref; refs to no listed component are kept, without the version if a purl."""
+        identity = self.refs.get(ref)
+        if identity is None:
+            identity = split_purl(ref)[0] if ref and ref.startswith('pkg:') else ref
+        return identity
+
+
+class SbomDiff(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    # (identity, old versions, new versions)
+    changed: List[Tuple[str, List[str], List[str]]]
+    edges_added: List[Tuple[str, str]]
+    edges_removed: List[Tuple[str, str]]
+
+    @property
+    def unchanged(self) -> bool:
+        return not (self.added or self.removed or self.changed or self.edges_added or self.edges_removed)
+
+    def to_dict(self) -> Dict:
+        return {
+            "unchanged": self.unchanged,
+            "components": {
+                "added": self.added,
+                "removed": self.removed,
+                "changed": [{"component": identity, "old": old, "new": new} for identity, old, new in self.changed],
+            },
+            "dependencies": {
+                "added": [{"ref": ref, "dependsOn": target} for ref, target in self.edges_added],
+                "removed": [{"ref": ref, "dependsOn": target} for ref, target in self.edges_removed],
+            },
+        }
+
+
+def _edge_changes(old: Dict[str, Set[str]], new: Dict[str, Set[str]]) -> List[Tuple[str, str]]:
+    """Return the edges of new that old does not have."""
+    changes = []
+    for ref, targets in new.items():
+        old_targets = old.get(ref, ())
+        changes.extend((ref, target) for target in targets if target not in old_targets)
+    return changes
+
+
+def diff_sboms(old: SbomIndex, new: SbomIndex) -> SbomDiff:
+    """Compare two indexed SBOMs with one lookup per component and per edge.
+
+    A component present in both with different versions is a change; added
+    and removed list full purls (or identity@version without one). Only the
+    differences are sorted, for stable output.
+    """
+    added, removed, changed = [], [], []
+    for identity, versions in new.components.items():
+        old_versions = old.components.get(identity)
+        if old_versions is None:
+            added.extend(_reference(identity, version, component) for version, component in versions.items())
+        elif versions.keys() != old_versions.keys():
+            changed.append((identity, sorted(old_versions), sorted(versions)))
+    for identity, versions in old.components.items():
+        if identity not in new.components:
+            removed.extend(_reference(identity, version, component) for version, component in versions.items())
+
+    return SbomDiff(sorted(added), sorted(removed), sorted(changed),
+                    sorted(_edge_changes(old.edges, new.edges)), sorted(_edge_changes(new.edges, old.edges)))
+
+
+def _reference(identity: str, version: str, component: Dict) -> str:
+    return component.get('purl') or (f"{identity}@{version}" if version else identity)
+
+
+def delta_document(new_sbom: Dict, old: SbomIndex, new: SbomIndex, diff: SbomDiff) -> Dict:
+    """Return a CycloneDX document with only what changed, in the new SBOM's spec version.
+
+    It holds the added and version-changed components as they appear in the
+    new SBOM, and the new dependency entries of every component whose edges
+    changed. Removed components are listed in metadata properties. Those
+    dependency entries may refer to unchanged components that are only in
+    the full SBOM.
+    """
+    changed = {identity for identity, _, _ in diff.changed}
+    components = [component for identity, versions in new.components.items()
+                  if identity in changed or identity not in old.components
+                  for component in versions.values()]
+
+    edge_refs = {ref for ref, _ in diff.edges_added}
+    edge_refs.update(ref for ref, _ in diff.edges_removed)
+    dependencies = [dependency for dependency in new_sbom.get('dependencies') or []
+                    if new.identity(dependency.get('ref')) in edge_refs]
+
+    metadata = dict(new_sbom.get('metadata') or {})
+    metadata["timestamp"] = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    metadata["properties"] = list(metadata.get("properties") or []) + [
+        {"name": "sbom-delta:removed", "value": reference} for reference in diff.removed
+    ]
+    return {
+        "bomFormat": "CycloneDX",
+        "specVersion": new_sbom.get('specVersion', '1.4'),
+        "version": 1,
+        "metadata": metadata,
+        "components": components,
+        "dependencies": dependencies,
+    }
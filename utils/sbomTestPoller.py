@@ -0,0 +1,162 @@
+import heapq
+import itertools
+import random
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import monotonic, sleep
+from typing import Any, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from utils.defaults import DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_POLL_INTERVAL, DEFAULT_POLL_INTERVAL, DEFAULT_POLL_TIMEOUT
+
+# Snyk SBOM test runs move from "processing" to one of these
+TERMINAL_STATUSES = ('finished', 'error', 'failed', 'completed')
+SUCCESS_STATUSES = ('finished', 'completed')
+
+
+class SbomTestResult(NamedTuple):
+    key: Any
+    org_id: str
+    test_run_id: str
+    status: str
+    results: Optional[dict] = None
+    error: Optional[str] = None
+    polls: int = 0
+    seconds: float = 0.0
+
+
+class _PendingRun:
+    __slots__ = ('key', 'org_id', 'test_run_id', 'sbom', 'started', 'delay', 'polls')
+
+    def __init__(self, key, org_id, test_run_id, started, delay, sbom=None):
+        self.key = key
+        self.org_id = org_id
+        self.test_run_id = test_run_id
+        self.sbom = sbom
+        self.started = started
+        self.delay = delay
+        self.polls = 0
+
+    def result(self, status, results=None, error=None):
+        return SbomTestResult(self.key, self.org_id, self.test_run_id, status, results, error,
+                              self.polls, round(monotonic() - self.started, 3))
+
+
+def test_run_status(status_response) -> Optional[str]:
+    """Return the status of a get_sbom_test_run_status response, if it has one."""
+    try:
+        return status_response['data']['attributes']['status']
+    except (KeyError, TypeError):
+        return None
+
+
+class SbomTestPoller:
+    """Waits on many SBOM test runs at once until each reaches a terminal status.
+
+    Every run is polled on its own schedule, starting at `poll_interval` and
+    backing off exponentially (with jitter, so runs submitted together do not
+    poll in lockstep) up to `max_poll_interval`. At most `max_concurrency`
+    status or result calls are in flight across all runs; waiting runs hold no
+    thread. Results are fetched once, when a run finishes.
+
+    HTTP throttling and retries are left to the client's rate-limit scheduler.
+    """
+
+    def __init__(self, client, max_concurrency=DEFAULT_MAX_CONCURRENCY, poll_interval=DEFAULT_POLL_INTERVAL,
+                 max_poll_interval=DEFAULT_MAX_POLL_INTERVAL, timeout=DEFAULT_POLL_TIMEOUT):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+
+    def _next_delay(self, delay):
+        return min(self.max_poll_interval, delay * 2) * random.uniform(0.8, 1.2)
+
+    def _create(self, run: _PendingRun) -> Optional[SbomTestResult]:
+        """Start the test run of a submitted SBOM; return a result only if that fails."""
+        sbom = run.sbom() if callable(run.sbom) else run.sbom
+        run.sbom = None
+        response = self.client.create_sbom_test_run(run.org_id, sbom)
+        run.test_run_id = response.get('data', {}).get('id') if isinstance(response, dict) else None
+        if not run.test_run_id:
+            return run.result('error', error=f"Could not find test run ID in response: {response}")
+        run.started = monotonic()
+        return None
+
+    def _check(self, run: _PendingRun) -> Optional[SbomTestResult]:
+        """Poll a run once; return its result if it is done, or None to poll again."""
+        if run.test_run_id is None:
+            return self._create(run)
+        run.polls += 1
+        status_response = self.client.get_sbom_test_run_status(run.org_id, run.test_run_id)
+        status = test_run_status(status_response)
+        if status not in TERMINAL_STATUSES:
+            return None
+        if status not in SUCCESS_STATUSES:
+            return run.result(status, error=f"SBOM test run ended with status {status}: {status_response}")
+        results = self.client.get_sbom_test_run_results(run.org_id, run.test_run_id)
+        return run.result(status, results=results)
+
+    def poll(self, runs: Iterable[Tuple[Any, str, str]]) -> Iterator[SbomTestResult]:
+        """Yield a result for every (key, org_id, test_run_id) as soon as that run is done.
+
+        Results come back in completion order. Runs that fail to poll, end in
+        error or outlive the timeout are yielded with `error` set rather than
+        raised, so one bad run does not stop the others.
+        """
+        now = monotonic()
+        # A run that was just created is never done yet
+        return self._run([(now + self.poll_interval, _PendingRun(key, org_id, test_run_id, now, self.poll_interval))
+                          for key, org_id, test_run_id in runs])
+
+    def submit_and_poll(self, sboms: Iterable[Tuple[Any, str, Any]]) -> Iterator[SbomTestResult]:
+        """Create a test run for every (key, org_id, sbom) and yield results as runs finish.
+
+        `sbom` is the SBOM document or a callable returning it, so large
+        batches are only loaded as they are submitted. Creating runs counts
+        against the same concurrency cap as polling them, and a run that
+        cannot be created is yielded as an error like any other failure.
+        """
+        now = monotonic()
+        return self._run([(now, _PendingRun(key, org_id, None, now, self.poll_interval, sbom))
+                          for key, org_id, sbom in sboms])
+
+    def _run(self, runs) -> Iterator[SbomTestResult]:
+        order = itertools.count()
+        # (next poll time, tie breaker, run)
+        schedule = [(due, next(order), run) for due, run in runs]
+        heapq.heapify(schedule)
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='sbom-test-poll') as executor:
+            while schedule or in_flight:
+                now = monotonic()
+                while schedule and schedule[0][0] <= now and len(in_flight) < self.max_concurrency:
+                    run = heapq.heappop(schedule)[2]
+                    in_flight[executor.submit(self._check, run)] = run
+
+                next_due = None
+                if schedule and len(in_flight) < self.max_concurrency:
+                    next_due = max(0.0, schedule[0][0] - now)
+                if not in_flight:
+                    sleep(next_due)
+                    continue
+
+                done, _ = wait(in_flight, timeout=next_due, return_when=FIRST_COMPLETED)
+                for future in done:
+                    run = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield run.result('error', error=str(e))
+                        continue
+                    if result is not None:
+                        yield result
+                        continue
+
+                    elapsed = monotonic() - run.started
+                    if elapsed >= self.timeout:
+                        yield run.result('timeout', error=f"SBOM test run still processing after {elapsed:.0f} seconds")
+                        continue
+                    if run.polls:
+                        run.delay = self._next_delay(run.delay)
+                    heapq.heappush(schedule, (monotonic() + run.delay, next(order), run))
@@ -1,163 +1,412 @@
 # import json
+import asyncio
 import json
-from time import sleep
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import requests
+from requests.adapters import HTTPAdapter
 # from requests.exceptions import HTTPError
 # import time
 
+from utils import metrics
 from utils.helper import get_snyk_token
+from utils.rateLimit import RateLimitScheduler
 
-SNYK_TOKEN = get_snyk_token()
-
-rest_headers = {'Content-Type': 'application/vnd.api+json', 'Authorization': f'token {SNYK_TOKEN}'}
-v1Headers = {'Content-Type': 'application/json; charset=utf-8', 'Authorization': f'token {SNYK_TOKEN}'}
 rest_version = '2024-10-15'
 
-def create_request_method(method):
-    methods = {
-        'GET': requests.get,
-        'POST': requests.post,
-        'PUT': requests.put,
-        'DELETE': requests.delete,
-        'PATCH': requests.patch,
-    }
+SNYK_API_URL = 'https://api.snyk.io'
+DEFAULT_POOL_SIZE = 10
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 60)
+
+
+_token = None
+_token_lock = threading.Lock()
+
+def get_token():
+    """Resolve SNYK_TOKEN on first use, so importing this module works offline and without a token."""
+    global _token
+    with _token_lock:
+        if _token is None:
+            _token = get_snyk_token()
+    return _token
+
+def __getattr__(name):
+    # SNYK_TOKEN, rest_headers and v1Headers used to be computed at import time
+    if name == 'SNYK_TOKEN':
+        return get_token()
+    if name == 'rest_headers':
+        return {'Content-Type': 'application/vnd.api+json', 'Authorization': f'token {get_token()}'}
+    if name == 'v1Headers':
+        return {'Content-Type': 'application/json; charset=utf-8', 'Authorization': f'token {get_token()}'}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _page_items(page):
+    """Return the items of a REST response page; single resources count as one item."""
+    data = page['data']
+    return data if isinstance(data, list) else [data]
+
+
+class SnykClient:
+    """Snyk API client that reuses pooled keep-alive connections across calls.
+
+    pool_size caps the number of open connections per host; extra concurrent
+    calls wait for a free connection instead of opening new ones.
+    """
+
+    def __init__(self, token=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, base_url=SNYK_API_URL,
+                 scheduler=None):
+        token = token or get_token()
+        # Clients share one scheduler by default so they draw from the same rate limit
+        self.scheduler = scheduler or get_default_scheduler()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.rest_headers = {'Content-Type': 'application/vnd.api+json', 'Authorization': f'token {token}'}
+        self.v1Headers = {'Content-Type': 'application/json; charset=utf-8', 'Authorization': f'token {token}'}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def request(self, method, url, headers=None, **kwargs):
+        """Send a request through the rate-limit scheduler, which handles throttling and retries."""
+        kwargs.setdefault('timeout', self.timeout)
+        with metrics.request_span(method, url) as call:
+            response = self.scheduler.send(self.session.request, method.upper(), url,
+                                           headers=headers or self.rest_headers, **kwargs)
+            if call is not None:
+                call['status'] = response.status_code
+            return response
+
+    def create_request_method(self, method):
+        if method.upper() not in ('GET', 'POST', 'PUT', 'DELETE', 'PATCH'):
+            return None
+        return partial(self.request, method)
+
+    # Paginate through Snyk's API endpoints; retries and backoff happen in the scheduler
+    def pagination_snyk_rest_endpoint(self, method, url, *args):
+        http_method = self.create_request_method(method)
+        if any(args):
+            api_response = http_method(url, data=json.dumps(args[0]))
+            api_response.raise_for_status()
+            return api_response.json()
+        else:
+            return list(self.iter_snyk_rest_endpoint(url, prefetch=False))
+
+    def _get_rest_page(self, url):
+        """GET one page of a REST endpoint, parsing the body once."""
+        api_response = self.request('GET', url)
+        api_response.raise_for_status()
+        return api_response.json()
+
+    def _next_page_url(self, page):
+        next_link = (page.get('links') or {}).get('next')
+        if not next_link:
+            return None
+        return next_link if next_link.startswith('http') else self.base_url + next_link
+
+    def iter_snyk_rest_endpoint(self, url, prefetch=True):
+        """Yield the items of a paginated REST endpoint page by page.
+
+        With prefetch, the next page is requested in the background while the
+        caller works through the current one.
+        """
+        if not prefetch:
+            while url:
+                page = self._get_rest_page(url)
+                yield from _page_items(page)
+                url = self._next_page_url(page)
+            return
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='snyk-prefetch') as executor:
+            pending = executor.submit(self._get_rest_page, url)
+            while pending is not None:
+                page = pending.result()
+                next_url = self._next_page_url(page)
+                pending = executor.submit(self._get_rest_page, next_url) if next_url else None
+                yield from _page_items(page)
+
+    def iter_snyk_orgs(self, groupId, prefetch=True):
+        url = f'{self.base_url}/rest/groups/{groupId}/orgs?version={rest_version}&limit=100'
+        return self.iter_snyk_rest_endpoint(url, prefetch)
+
+    def iter_org_memberships(self, org_id, prefetch=True):
+        url = f'{self.base_url}/rest/orgs/{org_id}/memberships?version={rest_version}&limit=100'
+        return self.iter_snyk_rest_endpoint(url, prefetch)
+
+    def iter_group_memberships(self, group_id, prefetch=True):
+        url = f'{self.base_url}/rest/groups/{group_id}/memberships?version={rest_version}&limit=100'
+        return self.iter_snyk_rest_endpoint(url, prefetch)
+
+    def iter_cpp_snyk_projects(self, org_id, target_id=None, prefetch=True):
+        url = f'{self.base_url}/rest/orgs/{org_id}/projects/?version={rest_version}&limit=100&types=nuget%2Ccpp'
+        if target_id:
+            url += f'&target_id={target_id}'
+        return self.iter_snyk_rest_endpoint(url, prefetch)
+
+    # Return user invitation list
+    def get_pending_user_list(self, org_id):
+        url = f'{self.base_url}/rest/orgs/{org_id}/invites?version={rest_version}'
+
+        pending_user_list = self.pagination_snyk_rest_endpoint('GET', url)
+
+        return pending_user_list
+
+    # Get group membership
+    def get_org_memberships(self, org_id):
+        url = f'{self.base_url}/rest/orgs/{org_id}/memberships?version={rest_version}&limit=100'
+
+        org_membership_response = self.pagination_snyk_rest_endpoint('GET', url)
+
+        return org_membership_response
+
+    def get_group_memberships(self, group_id):
+        url = f'{self.base_url}/rest/groups/{group_id}/memberships?version={rest_version}&limit=100'
+
+        org_membership_response = self.pagination_snyk_rest_endpoint('GET', url)
+
+        return org_membership_response
+
+    def create_group_membership_for_user(self, group_id, role_id, user_id):
+        url = f'{self.base_url}/rest/groups/{group_id}/memberships?version={rest_version}'
+        body = {"data": {"relationships": {"group": {"data": {"id": group_id,"type": "group"}},"role": {"data": {"id": role_id,"type": "group_role"}},"user": {"data": {"id": user_id,"type": "user"}}},"type": "group_membership"}}
+
+        group_membership_response = self.pagination_snyk_rest_endpoint('POST', url, body)
+
+        return group_membership_response
+
+    def create_sbom_test_run(self, org_id, sbom_data):
+        url = f'{self.base_url}/rest/orgs/{org_id}/sbom_tests?version=2024-10-15~beta'
+        body = {"data": {"type": "sbom_test","attributes": {"sbom":sbom_data}}}
+        sbom_test_run_response = self.pagination_snyk_rest_endpoint('POST', url, body)
+        return sbom_test_run_response
+
+    def get_sbom_test_run_status(self, org_id, sbom_test_run_id):
+        url = f'{self.base_url}/rest/orgs/{org_id}/sbom_tests/{sbom_test_run_id}?version=2024-10-15~beta'
+        # A single resource, not a collection: its status is in data.attributes.status
+        sbom_test_run_status_response = self._get_rest_page(url)
+        return sbom_test_run_status_response
+
+    def get_sbom_test_run_results(self, org_id, sbom_test_run_id):
+        url = f'{self.base_url}/rest/orgs/{org_id}/sbom_tests/{sbom_test_run_id}/results?version=2024-10-15~beta'
+        sbom_test_run_results_response = self._get_rest_page(url)
+        return sbom_test_run_results_response
+
+    # Return all Snyk orgs in group
+    def get_snyk_orgs(self, groupId):
+        url = f'{self.base_url}/rest/groups/{groupId}/orgs?version={rest_version}&limit=100'
+
+        org_data = self.pagination_snyk_rest_endpoint('GET', url)
+
+        return org_data
+
+    # Get cpp projects from all Snyk Orgs.
+    def get_cpp_snyk_projects_for_target(self, org_id, target_id):
+        url = f'{self.base_url}/rest/orgs/{org_id}/projects/?version={rest_version}&limit=100&types=nuget%2Ccpp&target_id={target_id}'
 
-    http_method = methods.get(method.upper())
-    
-    return http_method
+        cpp_project_data = self.pagination_snyk_rest_endpoint('GET', url)
+
+        return cpp_project_data
+
+    # Add a member to an organization within a group
+    def add_member_to_snyk_organization(self, group_id, org_id, user_id, role):
+        print(f"Adding user to Snyk organization.")
+        url = f'{self.base_url}/v1/group/{group_id}/org/{org_id}/members'
+        body = {"userId": user_id, "role": role}
+        try:
+            add_member_response = self.request('POST', url, headers=self.v1Headers, data=json.dumps(body))
+        except requests.RequestException as e:
+            print(f"Add user endpoint failed with the following error: {e}")
+            return False, e
+        if add_member_response.status_code == 200:
+            print("User added successfully.")
+            return True
+        print(f"Add user endpoint failed with the following error code: {add_member_response.status_code}.  Here is the error: {add_member_response.text} ")
+        return False, add_member_response
+
+
+class AsyncSnykClient:
+    """asyncio front end to SnykClient.
+
+    Calls run on a worker thread pool sized to the connection pool, so any
+    number of coroutines can be awaited at once while the HTTP traffic shares
+    the same few keep-alive connections.
+    """
+
+    def __init__(self, client=None, **client_options):
+        self.client = client or SnykClient(**client_options)
+        self.executor = ThreadPoolExecutor(max_workers=self.client.pool_size, thread_name_prefix='snyk-api')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.client.close()
+
+    async def _call(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def pagination_snyk_rest_endpoint(self, method, url, *args):
+        return await self._call(self.client.pagination_snyk_rest_endpoint, method, url, *args)
+
+    async def iter_snyk_rest_endpoint(self, url, prefetch=True):
+        """Async generator over the items of a paginated REST endpoint, prefetching the next page."""
+        pending = asyncio.ensure_future(self._call(self.client._get_rest_page, url))
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                next_url = self.client._next_page_url(page)
+                if next_url and prefetch:
+                    pending = asyncio.ensure_future(self._call(self.client._get_rest_page, next_url))
+                for item in _page_items(page):
+                    yield item
+                if next_url and not prefetch:
+                    pending = asyncio.ensure_future(self._call(self.client._get_rest_page, next_url))
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def get_pending_user_list(self, org_id):
+        return await self._call(self.client.get_pending_user_list, org_id)
+
+    async def get_org_memberships(self, org_id):
+        return await self._call(self.client.get_org_memberships, org_id)
+
+    async def get_group_memberships(self, group_id):
+        return await self._call(self.client.get_group_memberships, group_id)
+
+    async def create_group_membership_for_user(self, group_id, role_id, user_id):
+        return await self._call(self.client.create_group_membership_for_user, group_id, role_id, user_id)
+
+    async def create_sbom_test_run(self, org_id, sbom_data):
+        return await self._call(self.client.create_sbom_test_run, org_id, sbom_data)
+
+    async def get_sbom_test_run_status(self, org_id, sbom_test_run_id):
+        return await self._call(self.client.get_sbom_test_run_status, org_id, sbom_test_run_id)
+
+    async def get_sbom_test_run_results(self, org_id, sbom_test_run_id):
+        return await self._call(self.client.get_sbom_test_run_results, org_id, sbom_test_run_id)
+
+    async def get_snyk_orgs(self, groupId):
+        return await self._call(self.client.get_snyk_orgs, groupId)
+
+    async def get_cpp_snyk_projects_for_target(self, org_id, target_id):
+        return await self._call(self.client.get_cpp_snyk_projects_for_target, org_id, target_id)
+
+    async def add_member_to_snyk_organization(self, group_id, org_id, user_id, role):
+        return await self._call(self.client.add_member_to_snyk_organization, group_id, org_id, user_id, role)
+
+
+_default_client = None
+_default_scheduler = None
+_default_client_lock = threading.RLock()
+
+def get_default_scheduler():
+    """Return the process-wide rate-limit scheduler shared by all clients."""
+    global _default_scheduler
+    with _default_client_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RateLimitScheduler()
+    return _default_scheduler
+
+def get_default_client():
+    """Return the shared client behind the module-level functions, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = SnykClient()
+    return _default_client
+
+
+def create_request_method(method):
+    return get_default_client().create_request_method(method)
 
 
 # Paginate through Snyk's API endpoints with retry and backoff
 def pagination_snyk_rest_endpoint(method, url, *args):
-    retries = 3
-    delay = 5
-    http_method = create_request_method(method)
-    if any(args):
-        for attempt in range(retries):
-            try:
-                api_response = http_method(url, headers=rest_headers, data=json.dumps(args[0]))
-                api_response.raise_for_status()
-                return api_response.json()
-            except requests.RequestException as e:
-                print(f"Attempt {attempt + 1} failed: {e}")
-                if attempt < retries - 1:
-                    sleep(delay)
-                else:
-                    print("All attempts failed.")
-                    raise
-    else:
-        has_next_link = True
-        data = []
-        while has_next_link:
-            for attempt in range(retries):
-                try:
-                    api_response = http_method(url, headers=rest_headers)
-                    api_data = api_response.json()['data']
-                    data.extend(api_data)
-                    # If the response status is 429, handle the rate limit
-                    if api_response.status_code == 429:
-                        print(f"Rate limit exceeded. Waiting for 60 seconds.")
-                        sleep(61)
-                        continue
-                except requests.RequestException as e:
-                    print(f"Attempt {attempt + 1} failed: {e}")
-                    if attempt < retries - 1:
-                        sleep(delay)
-                    else:
-                        print("All attempts failed.")
-                        raise
-                
-                # Check if next page exist and set url if it does.  If not, exit and return issuesData
-                try:
-                    api_response.json()['links']['next']
-                    url = 'https://api.snyk.io' + api_response.json()['links']['next']
-                except:
-                    has_next_link = False
-                    return data
-    
+    return get_default_client().pagination_snyk_rest_endpoint(method, url, *args)
+
+
+# Stream the items of a paginated REST endpoint page by page
+def iter_snyk_rest_endpoint(url, prefetch=True):
+    return get_default_client().iter_snyk_rest_endpoint(url, prefetch)
+
 
 # Return user invitation list
 def get_pending_user_list(org_id):
-    url = f'https://api.snyk.io/rest/orgs/{org_id}/invites?version={rest_version}'
-    
-    pending_user_list = pagination_snyk_rest_endpoint('GET', url)
-    
-    return pending_user_list
+    return get_default_client().get_pending_user_list(org_id)
 
 
 # Get group membership
 def get_org_memberships(org_id):
-    url = f'https://api.snyk.io/rest/orgs/{org_id}/memberships?version={rest_version}&limit=100'
-    
-    org_membership_response = pagination_snyk_rest_endpoint('GET', url)
-    
-    return org_membership_response
+    return get_default_client().get_org_memberships(org_id)
 
 def get_group_memberships(group_id):
-    url = f'https://api.snyk.io/rest/group/{group_id}/memberships?version={rest_version}&limit=100'
-    
-    org_membership_response = pagination_snyk_rest_endpoint('GET', url)
-    
-    return org_membership_response
-    
-    
+    return get_default_client().get_group_memberships(group_id)
+
+
 def create_group_membership_for_user(group_id, role_id, user_id):
-    url = f'https://api.snyk.io/rest/groups/{group_id}/memberships?version={rest_version}'
-    body = {"data": {"relationships": {"group": {"data": {"id": group_id,"type": "group"}},"role": {"data": {"id": role_id,"type": "group_role"}},"user": {"data": {"id": user_id,"type": "user"}}},"type": "group_membership"}}
-    
-    group_membership_response = pagination_snyk_rest_endpoint('POST', url, body)
-    
-    return group_membership_response
+    return get_default_client().create_group_membership_for_user(group_id, role_id, user_id)
 
 def create_sbom_test_run(org_id, sbom_data):
-    url = f'https://api.snyk.io/rest/orgs/{org_id}/sbom_tests?version=2024-10-15~beta'
-    body = {"data": {"type": "sbom_test","attributes": {"sbom":sbom_data}}}
-    sbom_test_run_response = pagination_snyk_rest_endpoint('POST', url, body)
-    return sbom_test_run_response
+    return get_default_client().create_sbom_test_run(org_id, sbom_data)
 
 def get_sbom_test_run_status(org_id, sbom_test_run_id):
-    url = f'https://api.snyk.io/rest/orgs/{org_id}/sbom_tests/{sbom_test_run_id}?version=2024-10-15~beta'
-    sbom_test_run_status_response = pagination_snyk_rest_endpoint('GET', url)
-    print("SBOM test run status response:", sbom_test_run_status_response)
-    return sbom_test_run_status_response
+    return get_default_client().get_sbom_test_run_status(org_id, sbom_test_run_id)
+
+def get_sbom_test_run_results(org_id, sbom_test_run_id):
+    return get_default_client().get_sbom_test_run_results(org_id, sbom_test_run_id)
 
 # Return all Snyk orgs in group
 def get_snyk_orgs(groupId):
-    url = f'https://api.snyk.io/rest/groups/{groupId}/orgs?version={rest_version}&limit=100'
+    return get_default_client().get_snyk_orgs(groupId)
+
+def iter_snyk_orgs(groupId, prefetch=True):
+    return get_default_client().iter_snyk_orgs(groupId, prefetch)
+
+def iter_org_memberships(org_id, prefetch=True):
+    return get_default_client().iter_org_memberships(org_id, prefetch)
+
+def iter_group_memberships(group_id, prefetch=True):
+    return get_default_client().iter_group_memberships(group_id, prefetch)
 
-    org_data = pagination_snyk_rest_endpoint('GET', url)
-    
-    return org_data
+def iter_cpp_snyk_projects(org_id, target_id=None, prefetch=True):
+    return get_default_client().iter_cpp_snyk_projects(org_id, target_id, prefetch)
 
 
 # Get cpp projects from all Snyk Orgs.
 def get_cpp_snyk_projects_for_target(org_id, target_id):
-    url = f'https://api.snyk.io/rest/orgs/{org_id}/projects/?version={rest_version}&limit=100&types=nuget%2Ccpp&target_id={target_id}'
-    
-    cpp_project_data = pagination_snyk_rest_endpoint('GET', url)
-    
-    return cpp_project_data
+    return get_default_client().get_cpp_snyk_projects_for_target(org_id, target_id)
 
 
 # Delete a Snyk project
 # def delete_snyk_project(org_id, project_id):
 #     url = f'https://api.snyk.io/rest/orgs/{org_id}/projects/{project_id}?version={rest_version}'
-    
+
 #     delete_project_response = pagination_snyk_rest_endpoint('DELETE', url)
-    
+
 #     return delete_project_response
 
 
 # Add a member to an organization within a group
 def add_member_to_snyk_organization(group_id, org_id, user_id, role):
-    print(f"Adding user to Snyk organization.")
-    url = f'https://api.snyk.io/v1/group/{group_id}/org/{org_id}/memebers'
-    body = {"userId": user_id, "role": role}
-    try:
-        add_member_response = requests.post(url, headers=v1Headers, data=json.dumps(body))
-        if add_member_response.status_code == 200:
-            print("User added successfully.")
-            return True
-    except:
-        print(f"Add user endpoint failed with the following error code: {add_member_response.status_code}.  Here is the error: {add_member_response} ") 
-        return False, add_member_response
\ No newline at end of file
+    return get_default_client().add_member_to_snyk_organization(group_id, org_id, user_id, role)
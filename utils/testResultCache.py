@@ -0,0 +1,106 @@
+import hashlib
+import json
+import sqlite3
+from time import time
+from typing import Optional
+
+from utils.defaults import DEFAULT_RESULT_CACHE_MAX_BYTES, DEFAULT_RESULT_CACHE_TTL
+
+# Bump when the hash normalisation changes so old entries stop matching
+HASH_FORMAT = "1"
+
+# Top-level SBOM fields that change on every generation without changing what is tested
+VOLATILE_FIELDS = ('metadata', 'serialNumber', 'version')
+
+
+def _canonical(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def sbom_content_hash(sbom: dict, org_id: str = '') -> str:
+    """Hash what a Snyk SBOM test depends on: the components and their dependency edges.
+
+    Volatile fields such as metadata.timestamp and the serial number are
+    left out, and components and dependencies are sorted, so regenerating an
+    unchanged dependency set gives the same hash. Results depend on the
+    org's policies, so the org is part of the key.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{HASH_FORMAT}\0{org_id}\0".encode())
+    digest.update(_canonical({key: value for key, value in sbom.items()
+                              if key not in VOLATILE_FIELDS and key not in ('components', 'dependencies')}).encode())
+    for component in sorted(_canonical(component) for component in sbom.get('components') or []):
+        digest.update(b'\0c')
+        digest.update(component.encode())
+    dependencies = (
+        _canonical({**dependency, 'dependsOn': sorted(dependency.get('dependsOn') or [])})
+        for dependency in sbom.get('dependencies') or []
+    )
+    for dependency in sorted(dependencies):
+        digest.update(b'\0d')
+        digest.update(dependency.encode())
+    return digest.hexdigest()
+
+
+class TestResultCache:
+    """On-disk cache of SBOM test results keyed by sbom_content_hash.
+
+    Entries older than ttl seconds are treated as missing and dropped. When
+    the stored results grow past max_bytes, the least recently used entries
+    are evicted first.
+    """
+
+    def __init__(self, path, ttl: float = DEFAULT_RESULT_CACHE_TTL, max_bytes: int = DEFAULT_RESULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (hash TEXT PRIMARY KEY, created REAL, last_used REAL, size INTEGER, result TEXT)"
+        )
+        self.connection.execute("DELETE FROM results WHERE created < ?", (time() - self.ttl,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, sbom_hash: str) -> Optional[dict]:
+        """Return the cached results for a hash, or None if missing or expired."""
+        now = time()
+        row = self.connection.execute(
+            "SELECT result FROM results WHERE hash = ? AND created >= ?", (sbom_hash, now - self.ttl)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE results SET last_used = ? WHERE hash = ?", (now, sbom_hash))
+        return json.loads(row[0])
+
+    def put(self, sbom_hash: str, results: dict) -> None:
+        result = json.dumps(results, separators=(',', ':'))
+        now = time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (hash, created, last_used, size, result) VALUES (?, ?, ?, ?, ?)",
+            (sbom_hash, now, now, len(result), result)
+        )
+        self._evict()
+
+    def _evict(self) -> None:
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for sbom_hash, size in self.connection.execute("SELECT hash, size FROM results ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((sbom_hash,))
+            total -= size
+        self.connection.executemany("DELETE FROM results WHERE hash = ?", evicted)
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()